@@ -0,0 +1,78 @@
+# app/cli.py
+"""
+Command line tools working directly on the routes database (the API does not need to be running).
+
+Usage:
+    uv run python -m app.cli export [--format ndjson|msgpack] [--include-deleted] [-o FILE]
+    uv run python -m app.cli import [--format ndjson|msgpack] [--on-conflict skip|replace] [--no-apply] [-i FILE]
+"""
+import argparse
+import json
+import logging
+import sys
+from typing import BinaryIO, Iterator
+from app.core.logging import configure_logging
+from app.db.database import create_db_and_tables
+from app.services.snapshot import SNAPSHOT_MEDIA_TYPES, check_snapshot_format, export_snapshot, import_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _read_chunks(stream: BinaryIO, size: int = 64 * 1024) -> Iterator[bytes]:
+    while chunk := stream.read(size):
+        yield chunk
+
+
+def export_command(args: argparse.Namespace) -> None:
+    output = open(args.output, "wb") if args.output != "-" else sys.stdout.buffer
+    try:
+        for chunk in export_snapshot(args.format, include_deleted=args.include_deleted):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+
+def import_command(args: argparse.Namespace) -> None:
+    source = open(args.input, "rb") if args.input != "-" else sys.stdin.buffer
+    try:
+        result = import_snapshot(_read_chunks(source), args.format, replace=args.on_conflict == "replace", apply=args.apply)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+    print(json.dumps(result, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="app.cli", description="Route Manager API command line tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write a snapshot of the stored routes")
+    export_parser.add_argument("--format", choices=list(SNAPSHOT_MEDIA_TYPES), default="ndjson")
+    export_parser.add_argument("--include-deleted", action="store_true", help="Also export the Deleted_Routes table")
+    export_parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    export_parser.set_defaults(func=export_command)
+
+    import_parser = subparsers.add_parser("import", help="Restore a snapshot into the database and the system")
+    import_parser.add_argument("--format", choices=list(SNAPSHOT_MEDIA_TYPES), default="ndjson")
+    import_parser.add_argument("--on-conflict", choices=["skip", "replace"], default="skip",
+                               help="Keep or overwrite stored routes with the same destination")
+    import_parser.add_argument("--no-apply", dest="apply", action="store_false",
+                               help="Only store the routes, do not apply active routes to the system")
+    import_parser.add_argument("-i", "--input", default="-", help="Input file (default: stdin)")
+    import_parser.set_defaults(func=import_command)
+
+    args = parser.parse_args()
+
+    configure_logging()
+    try:
+        check_snapshot_format(args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    create_db_and_tables()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
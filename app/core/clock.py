@@ -0,0 +1,89 @@
+# app/core/clock.py
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
+
+
+class SystemClock:
+    """
+    Wall clock (UTC). Default clock of the application.
+    """
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Manually driven clock used by simulations to run the lifecycle at accelerated time.
+    Time only moves through `advance`/`advance_to`, or when a coroutine sleeps on it
+    (`sleep` moves time forward and returns immediately).
+    """
+
+    def __init__(self, start: Optional[datetime] = None) -> None:
+        self._lock = threading.Lock()
+        self._now: datetime = start or datetime.now(timezone.utc)
+
+    def now(self) -> datetime:
+        with self._lock:
+            return self._now
+
+    def advance(self, seconds: float) -> datetime:
+        """
+        Moves the clock `seconds` forward and returns the new time.
+        """
+        with self._lock:
+            self._now += timedelta(seconds=seconds)
+            return self._now
+
+    def advance_to(self, moment: datetime) -> datetime:
+        """
+        Moves the clock forward to `moment` (never backwards) and returns the new time.
+        """
+        with self._lock:
+            self._now = max(self._now, moment)
+            return self._now
+
+    async def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+        await asyncio.sleep(0)
+
+
+Clock = Union[SystemClock, VirtualClock]
+
+_clock: Clock = SystemClock()
+
+
+def now() -> datetime:
+    """
+    Returns the current (timezone-aware, UTC) time of the active clock.
+    Use instead of `datetime.now(timezone.utc)` so simulations can control time.
+    """
+    return _clock.now()
+
+
+async def sleep(seconds: float) -> None:
+    """
+    Sleeps `seconds` on the active clock.
+    """
+    await _clock.sleep(seconds)
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def set_clock(clock: Clock) -> Clock:
+    """
+    Replaces the active clock.
+
+    Returns:
+        Clock: The previously active clock, so it can be restored.
+    """
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
@@ -11,10 +11,44 @@ class Settings(BaseSettings):
         DATABASE_URL (str): Database connection URL.
         ROUTE_CHECK_INTERVAL (int): Interval (in seconds) for route checking.
         APITOKEN (str): Secret API token for authentication.
+        DEFERRED_STARTUP (bool): Accept connections immediately and initialize/reconcile routes in the background.
+        KERNEL_BACKEND (str): Where routes are installed: "iproute2" (the `ip` command) or "fake" (in-memory, for simulations).
+        ROUTE_PROTO (int): Routing protocol number (`ip route ... proto N`) tagging the routes installed by this service.
+        TRACING_ENABLED (bool): Record tracing spans for requests, database and system calls.
+        TRACING_EXPORTER (str): Where spans are written: "console" or the path of a JSON lines file.
+        PROFILING_HEADER (str): Request header that forces profiling of a single request.
+        PROFILING_SAMPLE_RATE (float): Fraction of requests (0.0 - 1.0) profiled automatically.
+        PROFILING_DIR (str): Directory where cProfile/pstats dumps are stored.
+        SLOW_REQUEST_THRESHOLD_MS (int): Requests slower than this (in milliseconds) are logged as slow.
+        LOG_LEVEL (str): Minimum level of emitted log records.
+        LOG_FORMAT (str): Log output format: "json" (structured) or "text".
+        LOG_MAX_OUTPUT_CHARS (int): Maximum number of characters of command output included in logs.
+        LOG_RATE_LIMITED_LOGGERS (str): Comma-separated logger names whose repeated messages are rate-limited.
+        LOG_RATE_LIMIT_SECONDS (float): Window (in seconds) during which identical messages are dropped.
+        IDEMPOTENCY_TTL_SECONDS (int): How long (in seconds) the response to a request with an Idempotency-Key is replayed.
+        IDEMPOTENCY_MAX_ENTRIES (int): Maximum number of responses kept in memory (least recently used are evicted).
+        IDEMPOTENCY_PERSIST (bool): Also store responses in the database, so they survive restarts.
     """
     DATABASE_URL: str = Field("sqlite:///./routes.db", env="DATABASE_URL")
     ROUTE_CHECK_INTERVAL: int = Field(10, env="ROUTE_CHECK_INTERVAL")
     APITOKEN: str = Field("this_is_something_secret", env="APITOKEN")
+    DEFERRED_STARTUP: bool = Field(True, env="DEFERRED_STARTUP")
+    KERNEL_BACKEND: str = Field("iproute2", env="KERNEL_BACKEND")
+    ROUTE_PROTO: int = Field(201, env="ROUTE_PROTO")
+    TRACING_ENABLED: bool = Field(False, env="TRACING_ENABLED")
+    TRACING_EXPORTER: str = Field("console", env="TRACING_EXPORTER")
+    PROFILING_HEADER: str = Field("X-Profile", env="PROFILING_HEADER")
+    PROFILING_SAMPLE_RATE: float = Field(0.0, env="PROFILING_SAMPLE_RATE")
+    PROFILING_DIR: str = Field("./profiles", env="PROFILING_DIR")
+    SLOW_REQUEST_THRESHOLD_MS: int = Field(500, env="SLOW_REQUEST_THRESHOLD_MS")
+    LOG_LEVEL: str = Field("INFO", env="LOG_LEVEL")
+    LOG_FORMAT: str = Field("json", env="LOG_FORMAT")
+    LOG_MAX_OUTPUT_CHARS: int = Field(2000, env="LOG_MAX_OUTPUT_CHARS")
+    LOG_RATE_LIMITED_LOGGERS: str = Field("app.services.lifecycle", env="LOG_RATE_LIMITED_LOGGERS")
+    LOG_RATE_LIMIT_SECONDS: float = Field(60.0, env="LOG_RATE_LIMIT_SECONDS")
+    IDEMPOTENCY_TTL_SECONDS: int = Field(86400, env="IDEMPOTENCY_TTL_SECONDS")
+    IDEMPOTENCY_MAX_ENTRIES: int = Field(10000, env="IDEMPOTENCY_MAX_ENTRIES")
+    IDEMPOTENCY_PERSIST: bool = Field(False, env="IDEMPOTENCY_PERSIST")
 
     model_config = {
         "env_file": str(Path(__file__).resolve().parent.parent.parent / ".env"),
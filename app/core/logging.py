@@ -1,12 +1,159 @@
 # app/core/logging.py
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from app.core.config import settings
+
+# ID of the HTTP request being served, set by the request middleware
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def truncate(text: str, limit: Optional[int] = None) -> str:
+    """
+    Shortens long texts (e.g. command output) before logging them.
+
+    Args:
+        text (str): The text to shorten.
+        limit (int, optional): Maximum number of characters. Defaults to LOG_MAX_OUTPUT_CHARS.
+    """
+    limit = settings.LOG_MAX_OUTPUT_CHARS if limit is None else limit
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more characters]"
+
+
+class ContextFilter(logging.Filter):
+    """
+    Attaches the current request ID to each record. Runs in the thread that
+    emits the record, before it is handed to the queue.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Drops repetitions of the same message from the given loggers for `interval` seconds.
+    The next emitted copy reports how many were suppressed.
+    """
+    def __init__(self, loggers: list[str], interval: float):
+        super().__init__()
+        self.loggers = tuple(loggers)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._seen: dict[tuple[str, int, str], tuple[float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.interval <= 0 or not record.name.startswith(self.loggers):
+            return True
+
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._seen.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._seen[key] = (last, suppressed + 1)
+                return False
+            self._seen[key] = (now, 0)
+            if len(self._seen) > 10_000:
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.interval}
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} (suppressed {suppressed} similar messages)"
+            record.args = None
+        return True
+
+
+# Renders tracebacks in the emitting thread (see ExceptionQueueHandler)
+_exception_formatter = logging.Formatter()
+
+
+class ExceptionQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps the traceback of a record. The base `prepare` merges the
+    message and clears `exc_info` and `exc_text`, so formatters running in the
+    listener would never see the exception. Here the traceback is rendered in the
+    emitting thread into `exc_text`, which formatters use when `exc_info` is unset.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+        # Tracebacks hold frames of the emitting thread: do not pass them to the listener
+        record.exc_info = None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        route = getattr(record, "route", None)
+        if route:
+            entry["route"] = route
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
 
 def configure_logging():
     """
     Global logging configuration.
-    Defines format and log level.
+    Records are put on a queue by the calling thread and written to the console
+    by a background listener, so handler I/O stays out of request handling.
+    Level and format (json/text) come from Settings.
     """
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s"
-    )
\ No newline at end of file
+    global _listener
+    if _listener is not None:
+        return
+
+    if settings.LOG_FORMAT == "json":
+        formatter: logging.Formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+    console = logging.StreamHandler()
+    console.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = ExceptionQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(RateLimitFilter(
+        [name.strip() for name in settings.LOG_RATE_LIMITED_LOGGERS.split(",") if name.strip()],
+        settings.LOG_RATE_LIMIT_SECONDS
+    ))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, console, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,107 @@
+# app/core/profiling.py
+import cProfile
+import functools
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Optional
+from fastapi import Request
+from app.core.config import settings
+from app.core.logging import request_id_var
+from app.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Holder shared between the middleware (event loop) and the endpoint (worker thread)
+_profile_request: ContextVar[Optional[dict]] = ContextVar("profile_request", default=None)
+
+# cProfile can only have one active profiler per interpreter
+_profiler_lock = threading.Lock()
+
+
+def profiled(func: Callable) -> Callable:
+    """
+    Decorator for API endpoints. Runs the endpoint under cProfile when the
+    current request was selected for profiling by `request_middleware`.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        holder = _profile_request.get()
+        if holder is None or not _profiler_lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            profiler = cProfile.Profile()
+            holder["profile"] = profiler
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            _profiler_lock.release()
+    return wrapper
+
+
+def _should_profile(request: Request) -> tuple[bool, bool]:
+    """
+    Decides whether a request is profiled.
+
+    Returns:
+        tuple[bool, bool]: (profile the request, profiling was explicitly requested with the header)
+    """
+    forced = request.headers.get(settings.PROFILING_HEADER, "").lower() in ("1", "true", "yes")
+    sampled = settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE
+    return forced or sampled, forced
+
+
+def _dump_profile(profiler: cProfile.Profile, request: Request, elapsed_ms: float) -> Path:
+    """
+    Stores the pstats output of a profiled request in PROFILING_DIR.
+    """
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path_name = re.sub(r"[^A-Za-z0-9]+", "_", request.url.path).strip("_") or "root"
+    target = directory / f"{time.strftime('%Y%m%dT%H%M%S')}-{request.method}-{path_name}-{int(elapsed_ms)}ms.pstats"
+    profiler.dump_stats(target)
+    return target
+
+
+async def request_middleware(request: Request, call_next):
+    """
+    HTTP middleware that tags each request with an ID (X-Request-ID), opens its
+    root tracing span, logs slow requests and saves the profile of requests
+    selected for profiling.
+    Sampled requests are only saved when slow; requests that ask for profiling
+    with the PROFILING_HEADER header are always saved.
+    """
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    profile, forced = _should_profile(request)
+    holder: Optional[dict] = {} if profile else None
+    id_token = request_id_var.set(request_id)
+    token = _profile_request.set(holder)
+    start = time.perf_counter()
+
+    try:
+        with span(f"{request.method} {request.url.path}", **{"http.method": request.method, "http.target": request.url.path, "request_id": request_id}) as root:
+            response = await call_next(request)
+            if root:
+                root.set_attribute("http.status_code", response.status_code)
+        response.headers["X-Request-ID"] = request_id
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        slow = elapsed_ms > settings.SLOW_REQUEST_THRESHOLD_MS
+        if slow:
+            logger.warning(f"Slow request: {request.method} {request.url.path} took {elapsed_ms:.1f} ms (status {response.status_code})")
+    finally:
+        _profile_request.reset(token)
+        request_id_var.reset(id_token)
+
+    if holder and holder.get("profile") and (forced or slow):
+        try:
+            target = _dump_profile(holder["profile"], request, elapsed_ms)
+            logger.info(f"Profile of {request.method} {request.url.path} saved to {target}")
+        except OSError as e:
+            logger.error(f"Failed to save request profile: {e}")
+
+    return response
@@ -0,0 +1,156 @@
+# app/core/tracing.py
+import atexit
+import functools
+import json
+import logging
+import logging.handlers
+import queue
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_export_lock = threading.Lock()
+_export_queue: queue.SimpleQueue = queue.SimpleQueue()
+_exporter: Optional[logging.handlers.QueueListener] = None
+
+
+class Span:
+    """
+    A unit of traced work. Serialized with the field names of the OpenTelemetry
+    data model so exported files can be converted or loaded by OTel tooling.
+    """
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "start_time_unix_nano",
+                 "end_time_unix_nano", "attributes", "status")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict[str, Any]):
+        self.name = name
+        self.trace_id: str = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id: str = secrets.token_hex(8)
+        self.parent_span_id: Optional[str] = parent.span_id if parent else None
+        self.start_time_unix_nano: int = time.time_ns()
+        self.end_time_unix_nano: Optional[int] = None
+        self.attributes: dict[str, Any] = attributes
+        self.status: str = "OK"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "duration_ms": round((self.end_time_unix_nano - self.start_time_unix_nano) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status},
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """
+    Returns the span active in the current context, if any.
+    """
+    return _current_span.get()
+
+
+class SpanFormatter(logging.Formatter):
+    """
+    Serializes the span carried by a record as one JSON line.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg.to_dict(), default=str)
+
+
+def _start_exporter() -> logging.handlers.QueueListener:
+    """
+    Starts the background listener that writes queued spans to the console (stderr)
+    or to the configured file, like the log listener of `configure_logging`.
+    """
+    if settings.TRACING_EXPORTER == "console":
+        handler: logging.Handler = logging.StreamHandler(sys.stderr)
+    else:
+        handler = logging.FileHandler(settings.TRACING_EXPORTER, encoding="utf-8")
+    handler.setFormatter(SpanFormatter())
+
+    listener = logging.handlers.QueueListener(_export_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def _export(finished: Span) -> None:
+    """
+    Queues a finished span for export. Serialization and I/O happen in the exporter
+    thread, so they stay out of request handling.
+    """
+    global _exporter
+    if _exporter is None:
+        with _export_lock:
+            if _exporter is None:
+                _exporter = _start_exporter()
+    _export_queue.put(logging.LogRecord(__name__, logging.INFO, __file__, 0, finished, None, None))
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Opens a tracing span as a child of the span active in the current context.
+    Does nothing (and yields None) when tracing is disabled.
+
+    Args:
+        name (str): Name of the span.
+        **attributes: Initial span attributes.
+    """
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.status = "ERROR"
+        current.set_attribute("exception.type", type(e).__name__)
+        current.set_attribute("exception.message", str(e))
+        raise
+    finally:
+        current.end_time_unix_nano = time.time_ns()
+        _current_span.reset(token)
+        try:
+            _export(current)
+        except OSError as e:
+            logger.error(f"Failed to export tracing span {name}: {e}")
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator that wraps every call of the decorated function in a tracing span.
+
+    Args:
+        name (str, optional): Name of the span. Defaults to the function's qualified name.
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not settings.TRACING_ENABLED:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,7 +1,9 @@
 # app/db/database.py
+from sqlalchemy import inspect
 from sqlmodel import SQLModel, create_engine
 from app.db.models.routes import DBRoute
 from app.db.models.deleted_routes import DeletedRoute
+from app.db.models.idempotency import IdempotencyRecord
 from app.core.config import settings
 
 
@@ -12,3 +14,22 @@ def create_db_and_tables() -> None:
     Create SQLite file and tables
     """
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
+
+
+def add_missing_columns() -> None:
+    """
+    Adds columns (and their indexes) introduced after a table was first created,
+    since `create_all` does not alter existing tables.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            missing = [column for column in table.columns if column.name not in existing]
+            for column in missing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+            for index in table.indexes:
+                if any(column in missing for column in index.columns):
+                    index.create(connection, checkfirst=True)
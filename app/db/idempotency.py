@@ -0,0 +1,44 @@
+# app/db/idempotency.py
+from typing import Optional
+from sqlalchemy import Table
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.db.database import engine
+from app.db.models.idempotency import IdempotencyRecord
+
+
+def store_idempotency_record_in_database(record: dict, now: float) -> None:
+    """
+    Stores (or replaces) the response of an idempotent request and purges expired records.
+
+    Args:
+        record (dict): The record, with keys key, fingerprint, status_code, headers, body and expires_at.
+        now (float): The current POSIX time, used to purge expired records.
+    """
+    table: Table = IdempotencyRecord.__table__
+    statement = sqlite_insert(table).values(**record)
+    statement = statement.on_conflict_do_update(
+        index_elements=["key"],
+        set_={column.name: statement.excluded[column.name] for column in table.columns if column.name != "key"}
+    )
+    with engine.begin() as connection:
+        connection.execute(statement)
+        connection.execute(table.delete().where(table.c.expires_at <= now))
+
+
+def get_idempotency_record_from_database(key: str, now: float) -> Optional[dict]:
+    """
+    Fetches the stored response of an idempotent request.
+
+    Args:
+        key (str): The (scoped) idempotency key.
+        now (float): The current POSIX time; expired records are ignored.
+
+    Returns:
+        Optional[dict]: The record, or None if it does not exist or has expired.
+    """
+    table: Table = IdempotencyRecord.__table__
+    with engine.connect() as connection:
+        row = connection.execute(
+            table.select().where(table.c.key == key, table.c.expires_at > now)
+        ).mappings().one_or_none()
+    return dict(row) if row else None
@@ -1,6 +1,7 @@
 from sqlmodel import SQLModel, Field
 from typing import Optional
 from datetime import datetime
+from app.core import clock
 
 class DeletedRoute(SQLModel, table=True):
     __tablename__ = "Deleted_Routes"
@@ -11,5 +12,6 @@ class DeletedRoute(SQLModel, table=True):
     dev: Optional[str] = None
     create_at: Optional[datetime] = None
     delete_at: Optional[datetime] = None
-    removed_at: datetime = Field(default_factory=datetime.utcnow)
+    removed_at: datetime = Field(default_factory=lambda: clock.now().replace(tzinfo=None))
     status: Optional[str] = None
+    group: Optional[str] = Field(default=None, index=True)
@@ -0,0 +1,10 @@
+from sqlmodel import SQLModel, Field
+
+class IdempotencyRecord(SQLModel, table=True):
+    __tablename__ = "Idempotency_Keys"
+    key: str = Field(primary_key=True)
+    fingerprint: str
+    status_code: int
+    headers: str
+    body: bytes
+    expires_at: float = Field(index=True)
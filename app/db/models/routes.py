@@ -11,3 +11,4 @@ class DBRoute(SQLModel, table=True):
     delete_at: Optional[datetime] = None
     active: bool
     status: Optional[str] = None
+    group: Optional[str] = Field(default=None, index=True)
@@ -0,0 +1,279 @@
+# app/db/registry.py
+import bisect
+import ipaddress
+import logging
+import math
+import socket
+import sys
+import threading
+from datetime import datetime
+from typing import Iterable, Optional
+from app.db.schedule import from_timestamp, to_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Registry key: network address and prefix length packed in a single integer,
+# (address << 8 | prefixlen) << 1 | is_ipv6
+RouteKey = int
+
+
+def _pack_address(address: str) -> int:
+    """
+    Packs an IP address as (address << 1 | is_ipv6).
+
+    Raises:
+        ValueError: If `address` is not a valid IP address.
+    """
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, address)) << 1
+    except OSError:
+        pass
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET6, address)) << 1 | 1
+    except OSError:
+        raise ValueError(f"'{address}' does not appear to be an IPv4 or IPv6 address")
+
+
+def _unpack_address(packed: int) -> str:
+    if packed & 1:
+        return str(ipaddress.IPv6Address(packed >> 1))
+    return socket.inet_ntoa((packed >> 1).to_bytes(4))
+
+
+def route_key(to: str) -> RouteKey:
+    """
+    Converts a destination ("10.0.0.0/24") to its compact registry key.
+
+    Raises:
+        ValueError: If `to` is not a valid IP network.
+    """
+    address, _, length = to.partition("/")
+    packed = _pack_address(address)
+    prefixlen = int(length) if length else (128 if packed & 1 else 32)
+    return (packed >> 1 << 8 | prefixlen) << 1 | packed & 1
+
+
+def route_to(key: RouteKey) -> str:
+    """
+    Converts a registry key back to its destination string.
+    """
+    return f"{_unpack_address(key >> 9 << 1 | key & 1)}/{key >> 1 & 0xFF}"
+
+
+class RouteRecord:
+    """
+    Compact in-memory copy of a row of "Saved Routes".
+    Addresses are stored as packed integers and timestamps as POSIX floats.
+    """
+    __slots__ = ("key", "via", "dev", "create_at", "delete_at", "active", "status", "group")
+
+    def __init__(self, key: RouteKey, via: Optional[str], dev: Optional[str], create_at: Optional[float],
+                 delete_at: Optional[float], active: bool, status: Optional[str], group: Optional[str] = None):
+        self.key = key
+        self.via: Optional[int] = _pack_address(via) if via else None
+        self.dev: Optional[str] = sys.intern(dev) if dev else None
+        self.create_at = create_at
+        self.delete_at = delete_at
+        self.active: bool = active
+        self.status: Optional[str] = sys.intern(status) if status else None
+        self.group: Optional[str] = sys.intern(group) if group else None
+
+    def to_dict(self) -> dict:
+        """
+        Returns the route with the same shape as `get_routes_from_database` entries.
+        """
+        return {
+            "to": route_to(self.key),
+            "via": _unpack_address(self.via) if self.via is not None else None,
+            "dev": self.dev,
+            "create_at": from_timestamp(self.create_at) if self.create_at is not None else None,
+            "delete_at": from_timestamp(self.delete_at) if self.delete_at is not None else None,
+            "active": self.active,
+            "status": self.status,
+            "group": self.group,
+        }
+
+
+def _start(record: RouteRecord) -> float:
+    return record.create_at if record.create_at is not None else -math.inf
+
+
+class RouteRegistry:
+    """
+    Authoritative in-process copy of "Saved Routes". Loaded once at startup and
+    kept up to date (write-through) by the mutation helpers in `app/db/routes.py`,
+    so reads are answered from memory: O(1) by destination, O(k) by status, dev or group.
+    Pending routes are also kept sorted by create_at, so the lifecycle reads the ones
+    due for activation in O(log n + k).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._routes: dict[RouteKey, RouteRecord] = {}
+        self._by_status: dict[Optional[str], set[RouteKey]] = {}
+        self._by_dev: dict[str, set[RouteKey]] = {}
+        self._by_group: dict[str, set[RouteKey]] = {}
+        # (create_at, key) of the pending routes, sorted; None while `load` bulk-builds it
+        self._pending: Optional[list[tuple[float, RouteKey]]] = []
+        self.loaded: bool = False
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def _index(self, key: RouteKey, record: RouteRecord) -> None:
+        self._by_status.setdefault(record.status, set()).add(key)
+        if record.status == "pending" and self._pending is not None:
+            bisect.insort(self._pending, (_start(record), key))
+        if record.dev:
+            self._by_dev.setdefault(record.dev, set()).add(key)
+        if record.group:
+            self._by_group.setdefault(record.group, set()).add(key)
+
+    def _unindex(self, key: RouteKey, record: RouteRecord) -> None:
+        if record.status == "pending" and self._pending is not None:
+            entry = (_start(record), key)
+            position = bisect.bisect_left(self._pending, entry)
+            if position < len(self._pending) and self._pending[position] == entry:
+                self._pending.pop(position)
+        for index, value in ((self._by_status, record.status), (self._by_dev, record.dev), (self._by_group, record.group)):
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+
+    def load(self, routes: Iterable[dict]) -> None:
+        """
+        Replaces the registry content with the given routes (dicts as returned by `get_routes_from_database`).
+        """
+        with self._lock:
+            self._routes, self._by_status, self._by_dev, self._by_group = {}, {}, {}, {}
+            self._pending = None
+            for route in routes:
+                try:
+                    self._put(route["to"], route["via"], route["dev"], route["create_at"], route["delete_at"], route["active"], route["status"], route.get("group"))
+                except ValueError as e:
+                    logger.error(f"Route {route['to']} not loaded in the registry: {e}")
+            self._pending = sorted((_start(self._routes[key]), key) for key in self._by_status.get("pending", ()))
+            self.loaded = True
+        logger.info(f"Route registry loaded with {len(self._routes)} routes")
+
+    def _put(self, to: str, via, dev, create_at, delete_at, active: bool, status: Optional[str], group: Optional[str]) -> None:
+        key = route_key(to)
+        record = RouteRecord(key, str(via) if via else None, dev, to_timestamp(create_at), to_timestamp(delete_at), bool(active), status, group)
+        previous = self._routes.get(key)
+        if previous is not None:
+            self._unindex(key, previous)
+        self._routes[key] = record
+        self._index(key, record)
+
+    def upsert(self, to: str, via, dev: Optional[str], create_at: Optional[datetime | str],
+               delete_at: Optional[datetime | str], active: bool, status: Optional[str], group: Optional[str] = None) -> None:
+        """
+        Inserts or replaces the route to `to`.
+        """
+        with self._lock:
+            self._put(to, via, dev, create_at, delete_at, active, status, group)
+
+    def update(self, to: str, **fields) -> bool:
+        """
+        Updates some fields (active, status, delete_at) of the route to `to`.
+
+        Returns:
+            bool: True if the route was found, False otherwise.
+        """
+        with self._lock:
+            key = route_key(to)
+            record = self._routes.get(key)
+            if record is None:
+                return False
+            self._unindex(key, record)
+            if "active" in fields:
+                record.active = bool(fields["active"])
+            if "status" in fields:
+                record.status = sys.intern(fields["status"]) if fields["status"] else None
+            if "delete_at" in fields:
+                record.delete_at = to_timestamp(fields["delete_at"])
+            self._index(key, record)
+            return True
+
+    def remove(self, to: str) -> bool:
+        """
+        Removes the route to `to`.
+
+        Returns:
+            bool: True if the route was found, False otherwise.
+        """
+        with self._lock:
+            key = route_key(to)
+            record = self._routes.pop(key, None)
+            if record is None:
+                return False
+            self._unindex(key, record)
+            return True
+
+    def get(self, to: str) -> Optional[dict]:
+        """
+        Returns the route to `to`, or None if it does not exist.
+        """
+        try:
+            key = route_key(to)
+        except ValueError:
+            return None
+        with self._lock:
+            record = self._routes.get(key)
+            return record.to_dict() if record else None
+
+    def all(self) -> list[dict]:
+        """
+        Returns every route.
+        """
+        with self._lock:
+            records = list(self._routes.values())
+        return [record.to_dict() for record in records]
+
+    def by_status(self, *statuses: Optional[str]) -> list[dict]:
+        """
+        Returns the routes whose status is one of `statuses`.
+        """
+        with self._lock:
+            records = [self._routes[key] for status in statuses for key in self._by_status.get(status, ())]
+        return [record.to_dict() for record in records]
+
+    def active(self) -> list[dict]:
+        """
+        Returns the routes flagged as active (installed in the system).
+        Only routes in status "active" can be flagged as such.
+        """
+        with self._lock:
+            records = [record for key in self._by_status.get("active", ()) if (record := self._routes[key]).active]
+        return [record.to_dict() for record in records]
+
+    def pending_due(self, moment: datetime) -> list[dict]:
+        """
+        Returns the pending routes whose create_at is at or before `moment`, oldest first.
+        """
+        t = to_timestamp(moment)
+        with self._lock:
+            due = bisect.bisect_right(self._pending, t, key=lambda entry: entry[0])
+            records = [self._routes[key] for _, key in self._pending[:due]]
+        return [record.to_dict() for record in records]
+
+    def by_group(self, group: str) -> list[dict]:
+        """
+        Returns the routes belonging to `group`.
+        """
+        with self._lock:
+            records = [self._routes[key] for key in self._by_group.get(group, ())]
+        return [record.to_dict() for record in records]
+
+    def by_dev(self, dev: str) -> list[dict]:
+        """
+        Returns the routes using the output device `dev`.
+        """
+        with self._lock:
+            records = [self._routes[key] for key in self._by_dev.get(dev, ())]
+        return [record.to_dict() for record in records]
+
+
+route_registry = RouteRegistry()
@@ -1,23 +1,67 @@
 # app/db/routes.py
+import functools
+import ipaddress
 import logging
 import json
+import pickle
+import tempfile
+import threading
 from datetime import datetime, timezone
-from sqlmodel import Session, select
+from typing import IO, Callable, Iterable, Iterator, Optional
+from sqlalchemy import Boolean, DateTime, String, Table, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, col, select
+from app.core import clock
+from app.core.tracing import traced
 from app.db.database import engine
 from app.db.models.routes import DBRoute
 from app.db.models.deleted_routes import DeletedRoute
+from app.db.registry import route_registry
+from app.db.schedule import schedule_index
 from app.schemas.routes import Route
 
 logger = logging.getLogger(__name__)
 
-def get_routes_from_database() -> list[dict]:
+# Rows fetched/inserted per round trip when streaming snapshots
+SNAPSHOT_BATCH_SIZE = 1000
+
+# Destinations per "IN (...)" clause, below SQLite's bound parameter limit
+IN_CLAUSE_CHUNK_SIZE = 500
+
+# Held by every write from its transaction until its write-through to the registry and
+# schedule index is done, so those are updated in the same order as the database commits.
+# Services also hold it to read a route and write a decision based on it atomically.
+write_lock = threading.RLock()
+
+
+def _serialized(func: Callable) -> Callable:
+    """
+    Decorator that runs a database write (and its write-through) under `write_lock`.
     """
-    Fetches all routes from the database.
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with write_lock:
+            return func(*args, **kwargs)
+    return wrapper
 
-    Returns:
-        list[json]: A list of JSON dictionaries corresponding to each stored route.
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Converts a datetime to UTC. SQLite drops the offset of the datetimes it stores, so they are
+    all written in UTC and the naive datetimes read back are interpreted as UTC.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _read_routes_from_database() -> list[dict]:
+    """
+    Reads all routes from the "Saved Routes" table, bypassing the in-memory registry.
     """
-    logger.info("Fetching routes from database...")
+    logger.debug("Fetching routes from database...")
 
     with Session(engine) as session, session.begin():
     # inner context calls session.commit(), if there were no exceptions
@@ -28,15 +72,99 @@ def get_routes_from_database() -> list[dict]:
         for route in db_routes:
             route_dict = json.loads(route.model_dump_json())
 
-            route_dict["create_at"] = datetime.fromisoformat(route_dict["create_at"]).astimezone(timezone.utc).isoformat()
+            route_dict["create_at"] = _utc(datetime.fromisoformat(route_dict["create_at"])).isoformat()
             if route_dict["delete_at"]:
-                route_dict["delete_at"] = datetime.fromisoformat(route_dict["delete_at"]).astimezone(timezone.utc).isoformat()
+                route_dict["delete_at"] = _utc(datetime.fromisoformat(route_dict["delete_at"])).isoformat()
 
             serialized_routes.append(route_dict)
 
-    logger.info("Routes fetched from database successfully")
+    logger.debug("Routes fetched from database successfully")
     return serialized_routes
 
+
+@traced()
+@_serialized
+def load_routes_into_memory() -> list[dict]:
+    """
+    Reads all stored routes from the database and (re)builds the in-memory route
+    registry and schedule index from them.
+
+    Returns:
+        list[json]: A list of JSON dictionaries corresponding to each stored route.
+    """
+    database_routes = _read_routes_from_database()
+    route_registry.load(database_routes)
+    schedule_index.load(database_routes)
+    return database_routes
+
+
+@traced()
+def get_routes_from_database() -> list[dict]:
+    """
+    Fetches all routes. Served from the in-memory registry once it has been loaded.
+
+    Returns:
+        list[json]: A list of JSON dictionaries corresponding to each stored route.
+    """
+    if route_registry.loaded:
+        return route_registry.all()
+    return _read_routes_from_database()
+
+
+def get_route_from_database(to: str) -> Optional[dict]:
+    """
+    Fetches a single route by destination. Served from the in-memory registry once it has been loaded.
+
+    Args:
+        to (str): The destination IP Address/Network of the route.
+
+    Returns:
+        dict | None: The route as a JSON dictionary, or None if it does not exist.
+    """
+    if route_registry.loaded:
+        return route_registry.get(to)
+    return next((route for route in _read_routes_from_database() if route["to"] == to), None)
+
+
+def get_routes_by_group_from_database(group: str) -> list[dict]:
+    """
+    Fetches the routes belonging to `group`. Served from the in-memory registry once it has been loaded.
+    """
+    if route_registry.loaded:
+        return route_registry.by_group(group)
+    return [route for route in _read_routes_from_database() if route.get("group") == group]
+
+
+def get_routes_by_dev_from_database(dev: str) -> list[dict]:
+    """
+    Fetches the routes using the output device `dev`. Served from the in-memory registry once it has been loaded.
+    """
+    if route_registry.loaded:
+        return route_registry.by_dev(dev)
+    return [route for route in _read_routes_from_database() if route["dev"] == dev]
+
+
+def get_routes_by_status_from_database(*statuses: str) -> list[dict]:
+    """
+    Fetches the routes whose status is one of `statuses`. Served from the in-memory registry once it has been loaded.
+    """
+    if route_registry.loaded:
+        return route_registry.by_status(*statuses)
+    return [route for route in _read_routes_from_database() if route["status"] in statuses]
+
+
+def get_pending_routes_due_from_database(now: datetime) -> list[dict]:
+    """
+    Fetches the pending routes whose create_at is at or before `now`. Served from the in-memory registry once it has been loaded.
+    """
+    if route_registry.loaded:
+        return route_registry.pending_due(now)
+    return [route for route in _read_routes_from_database()
+            if route["status"] == "pending" and route["create_at"] and datetime.fromisoformat(route["create_at"]) <= now]
+
+
+@traced()
+@_serialized
 def add_route_to_database(route: Route, active: bool, status: str) -> bool:
     """
     Adds a route to the database.
@@ -47,23 +175,29 @@ def add_route_to_database(route: Route, active: bool, status: str) -> bool:
     Returns:
         bool: True if the route was added successfully, False otherwise.
     """
-    logger.info("Adding route to database...")
+    logger.debug("Adding route to database...")
+    create_at, delete_at = _utc(route.create_at), _utc(route.delete_at)
     with Session(engine) as session, session.begin():
         db_route = DBRoute(
             to=str(route.to),
             via=str(route.via) if route.via else None,
             dev=route.dev,
-            create_at=route.create_at,
-            delete_at=route.delete_at,
+            create_at=create_at,
+            delete_at=delete_at,
             active=active,
-            status=status
+            status=status,
+            group=route.group
         )
         session.add(db_route)
 
-    logger.info(f"Route to {route.to} added to database successfully")
+    route_registry.upsert(str(route.to), route.via, route.dev, create_at, delete_at, active, status, route.group)
+    schedule_index.upsert(str(route.to), create_at, delete_at)
+    logger.info(f"Route to {route.to} added to database successfully", extra={"route": str(route.to)})
     return True
 
 
+@traced()
+@_serialized
 def delete_route_from_database(to: str,  status: str) -> bool:
     """
     Deletes a route from the database.
@@ -74,7 +208,7 @@ def delete_route_from_database(to: str,  status: str) -> bool:
     Returns:
         bool: True if the route was active in the system, False otherwise.
     """
-    logger.info("Deleting route from database...")
+    logger.debug("Deleting route from database...")
     with Session(engine) as session, session.begin():
         statement = select(DBRoute).where(DBRoute.to == to)
         db_route = session.exec(statement).one()
@@ -82,13 +216,16 @@ def delete_route_from_database(to: str,  status: str) -> bool:
         # Store in Deleted_Routes before removing from main table
         store_deleted_route_in_database(db_route, status=status)
 
-        print(db_route.active)
         session.delete(db_route)
 
-    logger.info(f"Route to {to} deleted from database successfully")
+    route_registry.remove(to)
+    schedule_index.remove(to)
+    logger.info(f"Route to {to} deleted from database successfully", extra={"route": to})
     return db_route.active
 
 
+@traced()
+@_serialized
 def activate_route_in_database(to: str) -> bool:
     """
     Updates the 'active' field of a route in the database to True.
@@ -99,24 +236,27 @@ def activate_route_in_database(to: str) -> bool:
     Returns:
         bool: True if the route was found and updated, False otherwise.
     """
-    logger.info(f"Activating route {to} in the database...")
+    logger.debug(f"Activating route {to} in the database...")
 
     with Session(engine) as session, session.begin():
         statement = select(DBRoute).where(DBRoute.to == to)
         db_route = session.exec(statement).one_or_none()
 
         if not db_route:
-            logger.warning(f"Route {to} not found in the database.")
+            logger.warning(f"Route {to} not found in the database.", extra={"route": to})
             return False
 
         db_route.active = True
         session.add(db_route)
         session.commit()
 
-    logger.info(f"Route {to} activated successfully in the database.")
+    route_registry.update(to, active=True)
+    logger.info(f"Route {to} activated successfully in the database.", extra={"route": to})
     return True
 
 
+@traced()
+@_serialized
 def deactivate_route_in_database(to: str) -> bool:
     """
     Updates the 'active' field of a route in the database to False.
@@ -127,24 +267,27 @@ def deactivate_route_in_database(to: str) -> bool:
     Returns:
         bool: True if the route was found and updated, False otherwise.
     """
-    logger.info(f"Deactivating route {to} in the database...")
+    logger.debug(f"Deactivating route {to} in the database...")
 
     with Session(engine) as session, session.begin():
         statement = select(DBRoute).where(DBRoute.to == to)
         db_route = session.exec(statement).one_or_none()
 
         if not db_route:
-            logger.warning(f"Route {to} not found in the database.")
+            logger.warning(f"Route {to} not found in the database.", extra={"route": to})
             return False
 
         db_route.active = False  # 🔹 Cambiamos active a False
         session.add(db_route)
         session.commit()
 
-    logger.info(f"Route {to} deactivated successfully in the database.")
+    route_registry.update(to, active=False)
+    logger.info(f"Route {to} deactivated successfully in the database.", extra={"route": to})
     return True
 
 
+@traced()
+@_serialized
 def update_route_status(to: str, new_status: str) -> bool:
     """
     Updates the 'status' field of a route in the database.
@@ -156,77 +299,167 @@ def update_route_status(to: str, new_status: str) -> bool:
     Returns:
         bool: True if the route was found and updated, False otherwise.
     """
-    logger.info(f"Updating status of route {to} to '{new_status}' in the database...")
+    logger.debug(f"Updating status of route {to} to '{new_status}' in the database...")
 
     with Session(engine) as session, session.begin():
         statement = select(DBRoute).where(DBRoute.to == to)
         db_route = session.exec(statement).one_or_none()
 
         if not db_route:
-            logger.warning(f"Route {to} not found in the database.")
+            logger.warning(f"Route {to} not found in the database.", extra={"route": to})
             return False
 
         db_route.status = new_status
         session.add(db_route)
         session.commit()
 
-    logger.info(f"Route {to} status updated successfully to '{new_status}'.")
+    route_registry.update(to, status=new_status)
+    logger.info(f"Route {to} status updated successfully to '{new_status}'.", extra={"route": to})
     return True
     
 
-def update_route_in_database(to: str, route_update: Route) -> bool:
+@traced()
+@_serialized
+def update_route_in_database(to: str, changes: dict, status: str, active: bool) -> bool:
     """
-    Updates an existing route in the database with new values, ensuring:
-    - 'via' and 'dev' are mutually exclusive (if one is updated, the other is removed).
-    - 'create_at' and 'delete_at' can be updated separately.
-    
+    Updates an existing route in the database with new values.
+
     Args:
         to (str): The destination IP Address/Network of the route to update.
-        route_update (Route): The new data for the route.
+        changes (dict): The new values of the modified fields (via, dev, create_at, delete_at, group).
+        status (str): The status of the route after the update.
+        active (bool): Whether the route is installed in the system after the update.
 
     Returns:
         bool: True if the update was successful, False otherwise.
     """
-    logger.info(f"Updating route {to} in the database...")
+    logger.debug(f"Updating route {to} in the database...")
 
     with Session(engine) as session, session.begin():
         statement = select(DBRoute).where(DBRoute.to == to)
         db_route = session.exec(statement).one_or_none()
 
         if not db_route:
-            logger.warning(f"Route {to} not found in the database.")
+            logger.warning(f"Route {to} not found in the database.", extra={"route": to})
             return False
 
-        # Overwrite "via" and "dev" together (if updating one, clear the other)
-        if route_update.via is not None:
-            db_route.via = str(route_update.via)
-            db_route.dev = None  # Remove dev if via is updated
-        elif route_update.dev is not None:
-            db_route.dev = route_update.dev
-            db_route.via = None  # Remove via if dev is updated
-
-        # Allow separate updates for create_at and delete_at
-        if route_update.create_at is not None:
-            db_route.create_at = route_update.create_at
-        if route_update.delete_at is not None:
-            db_route.delete_at = route_update.delete_at
-
-        # Default values: Let lifecycle manage activation
-        db_route.status = "pending"
-        db_route.active = False
+        for field, value in changes.items():
+            setattr(db_route, field, _utc(value) if field in ("create_at", "delete_at") else value)
+        db_route.status = status
+        db_route.active = active
 
+        via, dev, group = db_route.via, db_route.dev, db_route.group
+        create_at, delete_at = _utc(db_route.create_at), _utc(db_route.delete_at)
         session.add(db_route)
         session.commit()
 
-    logger.info(f"Route {to} successfully updated in the database.")
+    route_registry.upsert(to, via, dev, create_at, delete_at, active=active, status=status, group=group)
+    if "create_at" in changes or "delete_at" in changes:
+        schedule_index.upsert(to, create_at, delete_at)
+    logger.info(f"Route {to} successfully updated in the database.", extra={"route": to})
     return True
 
 
+def _chunks(items: list[str], size: int = IN_CLAUSE_CHUNK_SIZE) -> Iterator[list[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+@traced()
+@_serialized
+def set_routes_state_in_database(tos: list[str], active: bool, status: str) -> None:
+    """
+    Updates the 'active' and 'status' fields of several routes in a single transaction.
+
+    Args:
+        tos (list[str]): The destination IP Addresses/Networks of the routes to update.
+        active (bool): The new value of 'active'.
+        status (str): The new status ('active', 'paused', ...).
+    """
+    if not tos:
+        return
+    logger.debug(f"Setting {len(tos)} routes to active={active}, status='{status}' in the database...")
+
+    with Session(engine) as session, session.begin():
+        for chunk in _chunks(tos):
+            session.execute(update(DBRoute).where(col(DBRoute.to).in_(chunk)).values(active=active, status=status))
+
+    for to in tos:
+        route_registry.update(to, active=active, status=status)
+    logger.info(f"{len(tos)} routes set to status '{status}' in the database")
+
+
+@traced()
+@_serialized
+def delete_routes_from_database(tos: list[str], status: str) -> list[dict]:
+    """
+    Moves several routes to Deleted_Routes and removes them from the main table in a single transaction.
+
+    Args:
+        tos (list[str]): The destination IP Addresses/Networks of the routes to delete.
+        status (str): The status stored in Deleted_Routes ('deleted', 'expired').
+
+    Returns:
+        list[dict]: The deleted routes (to, via, dev, active, ...) as they were stored.
+    """
+    if not tos:
+        return []
+    logger.debug(f"Deleting {len(tos)} routes from database...")
+    routes_table: Table = DBRoute.__table__
+    removed_at = clock.now().replace(tzinfo=None)
+
+    deleted: list[dict] = []
+    with engine.begin() as connection:
+        for chunk in _chunks(tos):
+            rows = connection.execute(routes_table.select().where(routes_table.c.to.in_(chunk))).mappings().all()
+            if not rows:
+                continue
+            connection.execute(DeletedRoute.__table__.insert(), [
+                {"to": row["to"], "via": row["via"], "dev": row["dev"], "create_at": row["create_at"],
+                 "delete_at": row["delete_at"], "removed_at": removed_at, "status": status, "group": row["group"]}
+                for row in rows
+            ])
+            connection.execute(routes_table.delete().where(routes_table.c.to.in_(chunk)))
+            deleted.extend(dict(row) for row in rows)
+
+    for route in deleted:
+        route_registry.remove(route["to"])
+        schedule_index.remove(route["to"])
+    logger.info(f"{len(deleted)} routes deleted from database")
+    return deleted
+
+
+@traced()
+@_serialized
+def update_routes_delete_at_in_database(tos: list[str], delete_at: datetime) -> None:
+    """
+    Sets the 'delete_at' field of several routes in a single transaction.
+
+    Args:
+        tos (list[str]): The destination IP Addresses/Networks of the routes to update.
+        delete_at (datetime): The new scheduled deletion time.
+    """
+    if not tos:
+        return
+    logger.debug(f"Rescheduling deletion of {len(tos)} routes to {delete_at} in the database...")
+
+    with Session(engine) as session, session.begin():
+        for chunk in _chunks(tos):
+            session.execute(update(DBRoute).where(col(DBRoute.to).in_(chunk)).values(delete_at=delete_at))
+
+    for to in tos:
+        route_registry.update(to, delete_at=delete_at)
+        route = route_registry.get(to)
+        if route:
+            schedule_index.upsert(to, route["create_at"], delete_at)
+    logger.info(f"Deletion of {len(tos)} routes rescheduled to {delete_at}")
+
+
 def store_deleted_route_in_database(route: DBRoute, status: str) -> None:
     """
     Stores a deleted route in the deleted routes table.
     """
-    logger.info(f"Storing deleted route {route.to} in Deleted_Routes table...")
+    logger.debug(f"Storing deleted route {route.to} in Deleted_Routes table...")
 
     deleted_route = DeletedRoute(
         to=route.to,
@@ -234,18 +467,20 @@ def store_deleted_route_in_database(route: DBRoute, status: str) -> None:
         dev=route.dev,
         create_at=route.create_at,
         delete_at=route.delete_at,
-        status=status
+        status=status,
+        group=route.group
     )
 
     try:
         with Session(engine) as session, session.begin():
             session.add(deleted_route)
-            logger.info(f"Route {deleted_route.to} successfully added to Deleted_Routes with status '{status}'")
+            logger.info(f"Route {deleted_route.to} successfully added to Deleted_Routes with status '{status}'", extra={"route": deleted_route.to})
     except Exception as e:
-        logger.error(f"Failed to store route {route.to} in Deleted_Routes: {e}")
+        logger.error(f"Failed to store route {route.to} in Deleted_Routes: {e}", extra={"route": route.to})
 
 
 
+@traced()
 def get_deleted_routes_from_database() -> list[dict]:
     """
     Fetches all deleted routes from the Deleted_Routes table.
@@ -253,7 +488,7 @@ def get_deleted_routes_from_database() -> list[dict]:
     Returns:
         list[dict]: A list of JSON dictionaries representing deleted routes.
     """
-    logger.info("Fetching deleted routes from database...")
+    logger.debug("Fetching deleted routes from database...")
 
     with Session(engine) as session, session.begin():
         deleted_routes = session.exec(select(DeletedRoute)).all()
@@ -261,9 +496,214 @@ def get_deleted_routes_from_database() -> list[dict]:
         serialized_routes: list[dict] = []
         for route in deleted_routes:
             route_dict = json.loads(route.model_dump_json())
-            route_dict["removed_at"] = datetime.fromisoformat(route_dict["removed_at"]).astimezone(timezone.utc).isoformat()
+            route_dict["removed_at"] = _utc(datetime.fromisoformat(route_dict["removed_at"])).isoformat()
 
             serialized_routes.append(route_dict)
 
-    logger.info("Deleted routes fetched successfully")
+    logger.debug("Deleted routes fetched successfully")
     return serialized_routes
+
+
+def get_active_routes_from_database() -> list[dict]:
+    """
+    Fetches the destination, gateway and device of every active route.
+
+    Returns:
+        list[dict]: A list of dictionaries with keys to, via and dev.
+    """
+    if route_registry.loaded:
+        return [{"to": r["to"], "via": r["via"], "dev": r["dev"]} for r in route_registry.active()]
+    with engine.connect() as connection:
+        rows = connection.execute(select(DBRoute.to, DBRoute.via, DBRoute.dev).where(DBRoute.active == True)).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def _snapshot_row(row: dict) -> dict:
+    """
+    Converts a table row to a JSON/msgpack friendly dictionary (datetimes as ISO strings).
+    """
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+
+def _table_row(record: dict, table: Table) -> dict:
+    """
+    Converts a snapshot record back to a row of `table`, ignoring unknown keys and the surrogate id.
+
+    Raises:
+        ValueError: If a value does not match the type of its column (booleans must be JSON/msgpack
+            booleans, datetimes ISO strings).
+    """
+    row = {}
+    for column in table.columns:
+        if column.name == "id":
+            continue
+        value = record.get(column.name)
+        if value is not None:
+            if isinstance(column.type, DateTime):
+                if not isinstance(value, str):
+                    raise ValueError(f"Invalid '{column.name}' in snapshot record (expected an ISO datetime): {value!r}")
+                value = _utc(datetime.fromisoformat(value))
+            elif isinstance(column.type, Boolean) and not isinstance(value, bool):
+                raise ValueError(f"Invalid '{column.name}' in snapshot record (expected true or false): {value!r}")
+            elif isinstance(column.type, String) and not isinstance(value, str):
+                raise ValueError(f"Invalid '{column.name}' in snapshot record (expected a string): {value!r}")
+        row[column.name] = value
+    return row
+
+
+def _check_route_row(row: dict, interfaces: set[str]) -> None:
+    """
+    Applies the checks of the Route schema that still hold for stored routes: a valid
+    destination network, a valid gateway address, at least one of via/dev, an existing
+    device, and the state and creation time every stored route has. Addresses are normalized as the API stores them.
+
+    Raises:
+        ValueError: If the row is not a valid route.
+    """
+    try:
+        row["to"] = str(ipaddress.ip_network(row["to"]))
+        if row["via"]:
+            row["via"] = str(ipaddress.ip_address(row["via"]))
+    except ValueError as e:
+        raise ValueError(f"Invalid snapshot route {row['to']}: {e}")
+    if not row["via"] and not row["dev"]:
+        raise ValueError(f"Snapshot route {row['to']} must include at least one of 'via' or 'dev'")
+    if row["dev"] and row["dev"] not in interfaces:
+        raise ValueError(f"Snapshot route {row['to']}: '{row['dev']}' is not a valid network interface. "
+                         f"Valid interfaces are: {sorted(interfaces)}")
+    if row["active"] is None or row["create_at"] is None:
+        raise ValueError(f"Snapshot route {row['to']} must include 'active' and 'create_at'")
+
+
+def iter_snapshot_records_from_database(include_deleted: bool = False) -> Iterator[dict]:
+    """
+    Streams the stored routes (and optionally the deleted routes) without loading whole tables in memory.
+    Rows are read by keyset pagination, SNAPSHOT_BATCH_SIZE rows per short read, so no read
+    transaction stays open (blocking writers) while the consumer is slow, e.g. a client downloading an export.
+
+    Args:
+        include_deleted (bool): Also stream the Deleted_Routes table.
+
+    Yields:
+        dict: One record per row, with the source table under the "table" key ("routes" or "deleted_routes").
+    """
+    tables = [("routes", DBRoute.__table__, DBRoute.__table__.c.to)]
+    if include_deleted:
+        tables.append(("deleted_routes", DeletedRoute.__table__, DeletedRoute.__table__.c.id))
+
+    for name, table, key in tables:
+        last = None
+        while True:
+            query = table.select().order_by(key).limit(SNAPSHOT_BATCH_SIZE)
+            if last is not None:
+                query = query.where(key > last)
+            with engine.connect() as connection:
+                rows = connection.execute(query).mappings().all()
+            for row in rows:
+                yield {"table": name, **_snapshot_row(row)}
+            if len(rows) < SNAPSHOT_BATCH_SIZE:
+                break
+            last = rows[-1][key.name]
+
+
+def _spool_snapshot_rows(records: Iterable[dict]) -> tuple[IO[bytes], dict[str, int]]:
+    """
+    Validates snapshot records and writes them, converted to table rows, to a temporary file
+    in batches of SNAPSHOT_BATCH_SIZE rows. Reading the records (e.g. from the network) thus
+    happens before the database transaction is opened.
+
+    Returns:
+        tuple[IO[bytes], dict[str, int]]: The spool, rewound, and the number of rows per table.
+
+    Raises:
+        ValueError: If a record is malformed, is not a valid route or references an unknown table.
+    """
+    routes_table: Table = DBRoute.__table__
+    deleted_table: Table = DeletedRoute.__table__
+
+    import psutil  # Deferred, as in the Route schema: only needed to validate devices
+    interfaces = set(psutil.net_if_addrs())
+
+    spool = tempfile.TemporaryFile()
+    counts = {"routes": 0, "deleted_routes": 0}
+    batches: dict[str, list[dict]] = {"routes": [], "deleted_routes": []}
+    try:
+        for record in records:
+            if not isinstance(record, dict):
+                raise ValueError(f"Snapshot record is not a map: {record!r}")
+            table = record.get("table", "routes")
+            if table == "routes":
+                if not record.get("to"):
+                    raise ValueError(f"Snapshot route record without destination: {record}")
+                row = _table_row(record, routes_table)
+                _check_route_row(row, interfaces)
+            elif table == "deleted_routes":
+                row = _table_row(record, deleted_table)
+                row["removed_at"] = row["removed_at"] or clock.now().replace(tzinfo=None)
+            else:
+                raise ValueError(f"Unknown table '{table}' in snapshot record")
+
+            batches[table].append(row)
+            counts[table] += 1
+            if len(batches[table]) >= SNAPSHOT_BATCH_SIZE:
+                pickle.dump((table, batches[table]), spool)
+                batches[table] = []
+
+        for table, batch in batches.items():
+            if batch:
+                pickle.dump((table, batch), spool)
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+    return spool, counts
+
+
+def _iter_spooled_batches(spool: IO[bytes]) -> Iterator[tuple[str, list[dict]]]:
+    while True:
+        try:
+            yield pickle.load(spool)
+        except EOFError:
+            return
+
+
+@traced()
+def import_snapshot_records_to_database(records: Iterable[dict], replace: bool = False) -> dict[str, int]:
+    """
+    Bulk inserts snapshot records in a single transaction, in batches of SNAPSHOT_BATCH_SIZE rows.
+    Records are validated and spooled to disk first, so neither the transaction nor `write_lock`
+    is held while waiting for more records (which may come from the network, through the event loop).
+
+    Args:
+        records (Iterable[dict]): Records as produced by `iter_snapshot_records_from_database`.
+        replace (bool): Overwrite stored routes with the same destination instead of keeping them.
+
+    Returns:
+        dict[str, int]: Number of records processed per table.
+
+    Raises:
+        ValueError: If a record is malformed, is not a valid route or references an unknown table.
+    """
+    logger.info("Importing snapshot into database...")
+    routes_table: Table = DBRoute.__table__
+    deleted_table: Table = DeletedRoute.__table__
+
+    insert_route = sqlite_insert(routes_table)
+    if replace:
+        insert_route = insert_route.on_conflict_do_update(
+            index_elements=["to"],
+            set_={column.name: insert_route.excluded[column.name] for column in routes_table.columns if column.name != "to"}
+        )
+    else:
+        insert_route = insert_route.on_conflict_do_nothing(index_elements=["to"])
+    statements = {"routes": insert_route, "deleted_routes": deleted_table.insert()}
+
+    spool, counts = _spool_snapshot_rows(records)
+    with spool, write_lock:
+        with engine.begin() as connection:
+            for table, batch in _iter_spooled_batches(spool):
+                connection.execute(statements[table], batch)
+        load_routes_into_memory()
+    logger.info(f"Snapshot imported: {counts['routes']} routes, {counts['deleted_routes']} deleted routes")
+    return counts
@@ -0,0 +1,259 @@
+# app/db/schedule.py
+import bisect
+import heapq
+import logging
+import math
+import threading
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# The interval tree is rebuilt once the routes changed since it was built exceed this
+# fraction of the index (and MIN_REBUILD_CHANGES)
+REBUILD_FRACTION = 0.125
+MIN_REBUILD_CHANGES = 256
+
+
+def to_timestamp(value: Optional[datetime | str]) -> Optional[float]:
+    """
+    Converts a datetime (or its ISO representation) to a UTC POSIX timestamp.
+    Naive datetimes (as read back from SQLite) are interpreted as UTC.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def from_timestamp(value: float) -> Optional[str]:
+    """
+    Converts a UTC POSIX timestamp back to an ISO string (None for open-ended intervals).
+    """
+    if math.isinf(value):
+        return None
+    return datetime.fromtimestamp(value, timezone.utc).isoformat()
+
+
+class _Node:
+    """
+    Node of a centered interval tree. Holds every interval containing `center`,
+    sorted by start (ascending) and by end (descending).
+    """
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, intervals: list[tuple[float, float, str]]):
+        starts = sorted(start for start, _, _ in intervals)
+        self.center: float = starts[len(starts) // 2]
+
+        here, left, right = [], [], []
+        for interval in intervals:
+            start, end, _ = interval
+            if end <= self.center:
+                left.append(interval)
+            elif start > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        self.by_start = sorted(here, key=lambda i: i[0])
+        self.by_end = sorted(here, key=lambda i: i[1], reverse=True)
+        self.left: Optional[_Node] = _Node(left) if left else None
+        self.right: Optional[_Node] = _Node(right) if right else None
+
+
+def _build_tree(intervals: Iterable[tuple[str, tuple[float, float]]]) -> Optional[_Node]:
+    """
+    Builds an interval tree over (to, (start, end)) pairs, skipping empty intervals.
+    """
+    nodes = [(start, end, to) for to, (start, end) in intervals if start < end]
+    return _Node(nodes) if nodes else None
+
+
+class RouteScheduleIndex:
+    """
+    In-memory interval index over route lifetimes `[create_at, delete_at)`.
+
+    Activations and expirations are kept in sorted arrays so that window queries
+    are answered with two binary searches. Point queries ("which routes are active
+    at t") use a centered interval tree built from a snapshot of the index, plus an
+    overlay of the routes changed since then. Once the overlay outgrows
+    `REBUILD_FRACTION` of the index, the tree is rebuilt outside the lock and swapped
+    in unless the index was reloaded meanwhile, so mutations never wait for a rebuild.
+    Both queries run in O(log n + k) (plus the size of the overlay).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._intervals: dict[str, tuple[float, float]] = {}
+        self._starts: list[tuple[float, str]] = []
+        self._ends: list[tuple[float, str]] = []
+        self._tree: Optional[_Node] = None
+        # Routes changed since the tree snapshot (None: removed), and since the snapshot
+        # of a rebuild in progress (None: no rebuild running)
+        self._changes: dict[str, Optional[tuple[float, float]]] = {}
+        self._rebuild_changes: Optional[dict[str, Optional[tuple[float, float]]]] = None
+        self._version: int = 0
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def load(self, routes: Iterable[dict]) -> None:
+        """
+        Replaces the index content with the given routes (dicts with to, create_at and delete_at).
+        """
+        intervals: dict[str, tuple[float, float]] = {}
+        for route in routes:
+            start = to_timestamp(route["create_at"])
+            end = to_timestamp(route["delete_at"])
+            intervals[route["to"]] = (start if start is not None else -math.inf, end if end is not None else math.inf)
+
+        starts = sorted((start, to) for to, (start, _) in intervals.items())
+        ends = sorted((end, to) for to, (_, end) in intervals.items() if not math.isinf(end))
+        tree = _build_tree(intervals.items())
+
+        with self._lock:
+            self._intervals = intervals
+            self._starts = starts
+            self._ends = ends
+            self._tree = tree
+            self._changes = {}
+            self._rebuild_changes = None
+            self._version += 1
+
+        logger.info(f"Schedule index loaded with {len(intervals)} routes")
+
+    def upsert(self, to: str, create_at: Optional[datetime], delete_at: Optional[datetime]) -> None:
+        """
+        Inserts or replaces the lifetime of the route to `to`.
+        """
+        start = to_timestamp(create_at)
+        end = to_timestamp(delete_at)
+        start = start if start is not None else -math.inf
+        end = end if end is not None else math.inf
+
+        with self._lock:
+            self._discard(to)
+            self._intervals[to] = (start, end)
+            bisect.insort(self._starts, (start, to))
+            if not math.isinf(end):
+                bisect.insort(self._ends, (end, to))
+            self._record_change(to, (start, end))
+
+    def remove(self, to: str) -> None:
+        """
+        Removes the route to `to` from the index, if present.
+        """
+        with self._lock:
+            if to in self._intervals:
+                self._discard(to)
+                self._record_change(to, None)
+
+    def _discard(self, to: str) -> None:
+        interval = self._intervals.pop(to, None)
+        if interval is None:
+            return
+        start, end = interval
+        self._starts.pop(bisect.bisect_left(self._starts, (start, to)))
+        if not math.isinf(end):
+            self._ends.pop(bisect.bisect_left(self._ends, (end, to)))
+
+    def _record_change(self, to: str, interval: Optional[tuple[float, float]]) -> None:
+        self._changes[to] = interval
+        if self._rebuild_changes is not None:
+            self._rebuild_changes[to] = interval
+
+    def events_between(self, start: datetime, end: datetime) -> list[dict]:
+        """
+        Lists activations and expirations scheduled in `[start, end)`, ordered by time.
+
+        Returns:
+            list[dict]: Dictionaries with keys "to", "event" ("activation" or "expiration") and "at".
+        """
+        low, high = to_timestamp(start), to_timestamp(end)
+        with self._lock:
+            activations = self._starts[bisect.bisect_left(self._starts, (low, "")):bisect.bisect_left(self._starts, (high, ""))]
+            expirations = self._ends[bisect.bisect_left(self._ends, (low, "")):bisect.bisect_left(self._ends, (high, ""))]
+
+        merged: Iterator[tuple[float, str, str]] = heapq.merge(
+            ((at, "activation", to) for at, to in activations),
+            ((at, "expiration", to) for at, to in expirations),
+        )
+        return [{"to": to, "event": event, "at": from_timestamp(at)} for at, event, to in merged]
+
+    def expiring_before(self, moment: datetime) -> list[str]:
+        """
+        Lists the routes whose `delete_at` is at or before `moment`.
+        """
+        t = to_timestamp(moment)
+        with self._lock:
+            return [to for _, to in self._ends[:bisect.bisect_right(self._ends, t, key=lambda end: end[0])]]
+
+    def active_at(self, moment: datetime) -> list[dict]:
+        """
+        Lists the routes whose scheduled lifetime contains `moment`.
+
+        Returns:
+            list[dict]: Dictionaries with keys "to", "create_at" and "delete_at".
+        """
+        t = to_timestamp(moment)
+        with self._lock:
+            node, changes = self._tree, dict(self._changes)
+
+        # The tree is never mutated once built: it is walked without holding the lock
+        found: list[tuple[float, float, str]] = []
+        while node is not None:
+            if t < node.center:
+                for interval in node.by_start:
+                    if interval[0] > t:
+                        break
+                    found.append(interval)
+                node = node.left
+            elif t > node.center:
+                for interval in node.by_end:
+                    if interval[1] <= t:
+                        break
+                    found.append(interval)
+                node = node.right
+            else:
+                found.extend(node.by_start)
+                node = None
+
+        if changes:
+            found = [interval for interval in found if interval[2] not in changes]
+            found.extend((start, end, to) for to, interval in changes.items()
+                         if interval is not None and (start := interval[0]) <= t < (end := interval[1]))
+            if len(changes) > max(MIN_REBUILD_CHANGES, len(self._intervals) * REBUILD_FRACTION):
+                self._rebuild()
+
+        return [
+            {"to": to, "create_at": from_timestamp(start), "delete_at": from_timestamp(end)}
+            for start, end, to in found
+        ]
+
+    def _rebuild(self) -> None:
+        """
+        Rebuilds the interval tree from a snapshot of the index, outside the lock. Changes
+        made during the rebuild become the overlay of the new tree.
+        """
+        with self._lock:
+            if self._rebuild_changes is not None:
+                return  # Another thread is already rebuilding
+            snapshot = list(self._intervals.items())
+            version = self._version
+            self._rebuild_changes = {}
+
+        tree = _build_tree(snapshot)
+
+        with self._lock:
+            if self._version != version:
+                return  # Reloaded meanwhile: the tree of `load` is newer
+            self._tree = tree
+            self._changes = self._rebuild_changes
+            self._rebuild_changes = None
+
+
+schedule_index = RouteScheduleIndex()
@@ -2,11 +2,13 @@
 import logging
 from fastapi import FastAPI
 import asyncio
+from app.core.config import settings
 from app.core.logging import configure_logging
-from app.db.database import create_db_and_tables
-from app.services.routes import load_database_routes_to_system
-from app.routers import routes
+from app.core.profiling import request_middleware
+from app.routers import groups, health, routes
+from app.services.idempotency import idempotency_middleware
 from app.services.lifecycle import route_manager_loop
+from app.services.startup import run_startup
 
 configure_logging()
 logger = logging.getLogger(__name__)
@@ -16,19 +18,35 @@ app = FastAPI()
 
 def configure_app(app: FastAPI) -> None:
     """
-    Configure FastAPI application
+    Configure FastAPI application.
+    Database initialization and route reconciliation run on startup (see `start_background_tasks`).
     """
-    logger.info("Initialize database")
-    create_db_and_tables()
-
-    logger.info("Load stored routes")
-    load_database_routes_to_system()
+    # The last registered middleware is the outermost: replayed responses still get a request ID
+    logger.info("Register idempotency middleware")
+    app.middleware("http")(idempotency_middleware)
+    logger.info("Register request tracing and profiling middleware")
+    app.middleware("http")(request_middleware)
 
     logger.info("Register FastAPI routers")
+    app.include_router(health.health)
+    app.include_router(groups.groups)
     app.include_router(routes.routes)
 
+async def deferred_startup():
+    """
+    Runs the startup phase in a worker thread while the server already accepts
+    connections, then starts the lifecycle loop.
+    """
+    if await asyncio.to_thread(run_startup):
+        asyncio.create_task(route_manager_loop())
+
 @app.on_event("startup")
 async def start_background_tasks():
-    asyncio.create_task(route_manager_loop())
+    if settings.DEFERRED_STARTUP:
+        logger.info("Deferred startup: initializing database and loading stored routes in the background")
+        asyncio.create_task(deferred_startup())
+    else:
+        if run_startup():
+            asyncio.create_task(route_manager_loop())
 
 configure_app(app)
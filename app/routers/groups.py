@@ -0,0 +1,155 @@
+# app/routers/groups.py
+import logging
+import subprocess
+from datetime import datetime
+from typing import Annotated
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import SQLAlchemyError
+from app.core import clock
+from app.core.profiling import profiled
+from app.db.routes import get_routes_by_group_from_database
+from app.services.auth import bearer_token
+from app.services.groups import activate_group_routes, delete_group_routes, extend_group_routes, pause_group_routes
+from app.services.startup import require_ready
+
+logger = logging.getLogger(__name__)
+groups = APIRouter(prefix="/routes/groups", tags=["groups"])
+
+
+def _group_routes(group: str) -> list[dict]:
+    """
+    Fetches the routes of a group.
+
+    Raises:
+        HTTPException: 404 if the group has no routes.
+    """
+    routes = get_routes_by_group_from_database(group)
+    if not routes:
+        raise HTTPException(status_code=404, detail=f"Group {group} not found in the database.")
+    return routes
+
+
+def _summary(results: list[dict]) -> dict[str, int]:
+    summary: dict[str, int] = {}
+    for result in results:
+        summary[result["result"]] = summary.get(result["result"], 0) + 1
+    return summary
+
+
+@groups.get("/{group}", dependencies=[Depends(bearer_token)])
+@profiled
+def group_get(group: str) -> dict[str, list]:
+    """
+    Lists the routes of a group.
+
+    Args:
+        group (str): The group name.
+
+    Returns:
+        dict[str, list]: The routes stored in the database for this group.
+    """
+    logger.info(f"GET REQUEST RECEIVED for group {group}")
+    return JSONResponse(content={"routes": _group_routes(group)}, status_code=200)
+
+
+@groups.patch("/{group}/pause", dependencies=[Depends(bearer_token), Depends(require_ready)])
+@profiled
+def group_pause(group: str) -> dict:
+    """
+    Pauses every currently active route of a group.
+
+    Args:
+        group (str): The group name.
+
+    Returns:
+        dict: A summary and the per-route results.
+    """
+    logger.info(f"PATCH REQUEST RECEIVED to pause group {group}")
+    routes = _group_routes(group)
+
+    try:
+        results = pause_group_routes(routes)
+    except (SQLAlchemyError, subprocess.CalledProcessError) as e:
+        logger.error(f"Error while pausing group {group}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error while pausing group.")
+
+    return JSONResponse(content={"group": group, "summary": _summary(results), "routes": results}, status_code=200)
+
+
+@groups.patch("/{group}/activate", dependencies=[Depends(bearer_token), Depends(require_ready)])
+@profiled
+def group_activate(group: str) -> dict:
+    """
+    Reactivates every paused route of a group that is within its active period.
+
+    Args:
+        group (str): The group name.
+
+    Returns:
+        dict: A summary and the per-route results.
+    """
+    logger.info(f"PATCH REQUEST RECEIVED to activate group {group}")
+    routes = _group_routes(group)
+
+    try:
+        results = activate_group_routes(routes)
+    except (SQLAlchemyError, subprocess.CalledProcessError) as e:
+        logger.error(f"Error while activating group {group}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error while activating group.")
+
+    return JSONResponse(content={"group": group, "summary": _summary(results), "routes": results}, status_code=200)
+
+
+@groups.delete("/{group}", dependencies=[Depends(bearer_token), Depends(require_ready)])
+@profiled
+def group_delete(group: str) -> dict:
+    """
+    Deletes every route of a group from the database and the system.
+
+    Args:
+        group (str): The group name.
+
+    Returns:
+        dict: A summary and the per-route results.
+    """
+    logger.info(f"DELETE REQUEST RECEIVED for group {group}")
+    routes = _group_routes(group)
+
+    try:
+        results = delete_group_routes(routes)
+    except (SQLAlchemyError, subprocess.CalledProcessError) as e:
+        logger.error(f"Error while deleting group {group}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error while deleting group.")
+
+    return JSONResponse(content={"group": group, "summary": _summary(results), "routes": results}, status_code=200)
+
+
+@groups.patch("/{group}/extend", dependencies=[Depends(bearer_token), Depends(require_ready)])
+@profiled
+def group_extend(group: str, delete_at: Annotated[datetime, Body(embed=True)]) -> dict:
+    """
+    Reschedules the deletion of every route of a group.
+
+    Args:
+        group (str): The group name.
+        delete_at (datetime): The new deletion time (timezone-aware, in the future).
+
+    Returns:
+        dict: A summary and the per-route results.
+    """
+    logger.info(f"PATCH REQUEST RECEIVED to extend group {group} until {delete_at}")
+
+    if delete_at.tzinfo is None:
+        raise HTTPException(status_code=422, detail="delete_at must include a timezone")
+    if delete_at <= clock.now():
+        raise HTTPException(status_code=422, detail="delete_at must be in the future")
+    routes = _group_routes(group)
+
+    try:
+        results = extend_group_routes(routes, delete_at)
+    except SQLAlchemyError as e:
+        logger.error(f"Error while extending group {group}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error while extending group.")
+
+    return JSONResponse(content={"group": group, "summary": _summary(results), "routes": results}, status_code=200)
@@ -0,0 +1,26 @@
+# app/routers/health.py
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.startup import startup_state
+
+health = APIRouter(tags=["health"])
+
+
+@health.get("/healthz")
+def healthz() -> dict[str, str]:
+    """
+    Liveness probe: the process is up and serving HTTP.
+    """
+    return JSONResponse(content={"status": "ok"}, status_code=200)
+
+
+@health.get("/readyz")
+def readyz() -> dict:
+    """
+    Readiness probe: the database is initialized and stored routes have been reconciled.
+
+    Returns:
+        dict: The startup state, with status code 200 when ready and 503 otherwise.
+    """
+    state = startup_state.snapshot()
+    return JSONResponse(content=state, status_code=200 if state["ready"] else 503)
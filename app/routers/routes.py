@@ -2,52 +2,81 @@
 import logging
 import json
 import subprocess
-from typing import Annotated
-from fastapi import APIRouter, Body, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from typing import Annotated, Iterator, Literal, Optional
+import anyio
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.core import clock
+from app.core.profiling import profiled
 from app.services.auth import bearer_token
-from datetime import datetime, timezone
+from app.services.startup import require_ready
+from datetime import datetime
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
 from pydantic import IPvAnyNetwork
 from app.schemas.routes import Route, RouteUpdate
-from app.services.routes import add_route_to_system, delete_route_from_system
-from app.db.routes import get_routes_from_database, add_route_to_database, delete_route_from_database, update_route_in_database, get_deleted_routes_from_database, deactivate_route_in_database, update_route_status, activate_route_in_database
-from app.services.utils import run_command
+from app.services.routes import add_route_to_system, delete_route_from_system, get_database_routes, get_system_routes, is_in_active_period, update_route
+from app.db.schedule import schedule_index
+from app.db.routes import get_route_from_database, add_route_to_database, delete_route_from_database, get_deleted_routes_from_database, set_routes_state_in_database
+from app.services.snapshot import SNAPSHOT_MEDIA_TYPES, check_snapshot_format, export_snapshot, import_snapshot
 
 logger = logging.getLogger(__name__)
 routes = APIRouter(prefix="/routes", tags=["routes"])
 
 
 @routes.get("/", dependencies=[Depends(bearer_token)])
-def routes_get() -> dict[str, list]:
+@profiled
+def routes_get(
+    to: Annotated[Optional[IPvAnyNetwork], Query(description="Only the route to exactly this prefix")] = None,
+    root: Annotated[Optional[IPvAnyNetwork], Query(description="Only routes within this prefix")] = None,
+    match: Annotated[Optional[IPvAnyNetwork], Query(description="Only routes containing this prefix or address")] = None,
+    dev: Annotated[Optional[str], Query(description="Only routes through this output device")] = None,
+    table: Annotated[Optional[str], Query(pattern=r"^(main|local|default|all|\d+)$", description="Routing table (default: main)")] = None,
+    managed: Annotated[bool, Query(description="Only system routes installed by this service")] = False,
+) -> dict[str, list]:
     """
-    Fetches all active routes using the `ip route show` command.
+    Fetches the stored routes and the system routes using the `ip route show` command.
+    Filters are passed to the kernel, so targeted queries do not dump the whole routing table.
+
+    Args:
+        to (IPvAnyNetwork, optional): Only the route to exactly this prefix.
+        root (IPvAnyNetwork, optional): Only routes within this prefix.
+        match (IPvAnyNetwork, optional): Only routes containing this prefix or address.
+        dev (str, optional): Only routes through this output device.
+        table (str, optional): Routing table of the system routes ("main", "local", "all" or a table ID).
+        managed (bool): Only system routes installed by this service (tagged with ROUTE_PROTO).
 
     Returns:
-        `dict[str, list[str]]`: A Diccionary with key word "routes" and a list of active routes as value
+        `dict[str, list[str]]`: A Diccionary with key words "database_routes" and "system_routes"
     """
     logger.info("GET REQUEST RECEIVED")
+    if sum(prefix is not None for prefix in (to, root, match)) > 1:
+        raise HTTPException(status_code=422, detail="Only one of 'to', 'root' and 'match' can be used")
+    filters = {"to": str(to) if to else None, "root": str(root) if root else None, "match": str(match) if match else None, "dev": dev}
+
     try:
-        database_routes: list[dict] = get_routes_from_database()
+        database_routes: list[dict] = get_database_routes(**filters)
     except:
         raise HTTPException(status_code=500, detail="Error fetching routes from database")
     else:
         try:
-            system_routes: str = run_command(["ip", "route", "show"])
+            system_routes: list[str] = get_system_routes(**filters, table=table, managed=managed)
         except subprocess.CalledProcessError as e:
+            if "Cannot find device" in e.stderr:
+                raise HTTPException(status_code=422, detail=f"{e.stderr.strip()}")
             raise HTTPException(status_code=500, detail=f"{e.stderr.strip()}")
     
     return JSONResponse(
         content={
             "database_routes": database_routes,
-            "system_routes": [s.strip() for s in system_routes.splitlines()]
+            "system_routes": system_routes
         },
         status_code=200
     )
 
 
-@routes.put("/", dependencies=[Depends(bearer_token)])
+@routes.put("/", dependencies=[Depends(bearer_token), Depends(require_ready)])
+@profiled
 def routes_put(route: Route) -> dict[str, str]:
     """
     Schedules a new route to be added to the system and the database
@@ -60,7 +89,7 @@ def routes_put(route: Route) -> dict[str, str]:
     """
     logger.info("PUT REQUEST RECEIVED")
 
-    now = datetime.now(timezone.utc)
+    now = clock.now()
 
     if route.create_at > now:
         try:
@@ -104,7 +133,8 @@ def routes_put(route: Route) -> dict[str, str]:
     )
 
 
-@routes.delete("/", dependencies=[Depends(bearer_token)])
+@routes.delete("/", dependencies=[Depends(bearer_token), Depends(require_ready)])
+@profiled
 def routes_delete(to: Annotated[IPvAnyNetwork, Body(embed=True)]) -> dict[str, str]:
     """
     Removes an existing route from the system and the database
@@ -140,10 +170,12 @@ def routes_delete(to: Annotated[IPvAnyNetwork, Body(embed=True)]) -> dict[str, s
     )
 
 
-@routes.patch("/", dependencies=[Depends(bearer_token)])
+@routes.patch("/", dependencies=[Depends(bearer_token), Depends(require_ready)])
+@profiled
 def routes_update(route_update: RouteUpdate) -> dict[str, str]:
     """
-    Updates an existing route in the database.
+    Updates an existing route in the database. Installed routes whose next hop changes
+    are replaced in the system in the same request; no-op updates are skipped.
 
     Args:
         route_update (Route): A Route object containing the fields to update.
@@ -153,16 +185,33 @@ def routes_update(route_update: RouteUpdate) -> dict[str, str]:
     """
     logger.info(f"PATCH REQUEST RECEIVED to update route {route_update.to}")
 
-    if update_route_in_database(str(route_update.to), route_update):
+    route = get_route_from_database(str(route_update.to))
+    if not route:
+        raise HTTPException(status_code=404, detail=f"Route {route_update.to} not found in the database.")
+
+    try:
+        status = update_route(route, route_update)
+    except NoResultFound:
+        raise HTTPException(status_code=404, detail=f"Route {route_update.to} not found in the database.")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except subprocess.CalledProcessError as e:
+        logger.error(f"System error while updating route {route_update.to}: {e.stderr.strip()}")
+        raise HTTPException(status_code=500, detail=f"System error: {e.stderr.strip()}")
+
+    if status is None:
         return JSONResponse(
-            content={"message": f"Route {route_update.to} successfully updated"},
+            content={"message": f"Route {route_update.to} unchanged"},
             status_code=200
         )
-    else:
-        raise HTTPException(status_code=404, detail=f"Route {route_update.to} not found in the database.")
-    
+    return JSONResponse(
+        content={"message": f"Route {route_update.to} successfully updated", "status": status},
+        status_code=200
+    )
+
 
 @routes.get("/deleted", dependencies=[Depends(bearer_token)])
+@profiled
 def deleted_routes_get() -> dict[str, list]:
     """
     Fetches all deleted routes from the database.
@@ -183,7 +232,141 @@ def deleted_routes_get() -> dict[str, list]:
         status_code=200
     )
 
-@routes.patch("/pause", dependencies=[Depends(bearer_token)])
+@routes.get("/schedule", dependencies=[Depends(bearer_token), Depends(require_ready)])
+@profiled
+def schedule_get(
+    start: Annotated[datetime, Query(alias="from")],
+    end: Annotated[datetime, Query(alias="to")]
+) -> dict[str, list]:
+    """
+    Lists the route activations and expirations scheduled in the window [from, to).
+
+    Args:
+        start (datetime): Beginning of the window (inclusive), with timezone information.
+        end (datetime): End of the window (exclusive), with timezone information.
+
+    Returns:
+        dict[str, list]: A dictionary with key "events" and a time-ordered list of scheduled events as value.
+    """
+    logger.info(f"GET REQUEST RECEIVED for route schedule between {start} and {end}")
+
+    if start.tzinfo is None or end.tzinfo is None:
+        raise HTTPException(status_code=422, detail="Query parameters 'from' and 'to' must include timezone information")
+    if end < start:
+        raise HTTPException(status_code=422, detail="Query parameter 'to' can't be set before 'from'")
+
+    return JSONResponse(
+        content={"events": schedule_index.events_between(start, end)},
+        status_code=200
+    )
+
+
+@routes.get("/at", dependencies=[Depends(bearer_token), Depends(require_ready)])
+@profiled
+def routes_at_get(t: Annotated[datetime, Query()]) -> dict[str, list]:
+    """
+    Lists the routes whose scheduled lifetime includes the instant `t`.
+
+    Args:
+        t (datetime): The instant to query, with timezone information.
+
+    Returns:
+        dict[str, list]: A dictionary with key "routes" and a list of scheduled routes as value.
+    """
+    logger.info(f"GET REQUEST RECEIVED for routes active at {t}")
+
+    if t.tzinfo is None:
+        raise HTTPException(status_code=422, detail="Query parameter 't' must include timezone information")
+
+    return JSONResponse(
+        content={"routes": schedule_index.active_at(t)},
+        status_code=200
+    )
+
+
+@routes.get("/export", dependencies=[Depends(bearer_token)])
+@profiled
+def routes_export(
+    fmt: Annotated[Literal["ndjson", "msgpack"], Query(alias="format")] = "ndjson",
+    include_deleted: bool = False
+) -> StreamingResponse:
+    """
+    Streams the stored routes (and optionally the deleted routes) as a snapshot.
+
+    Args:
+        fmt (str): Snapshot format, "ndjson" (one JSON object per line) or "msgpack".
+        include_deleted (bool): Also export the Deleted_Routes table.
+
+    Returns:
+        StreamingResponse: The snapshot, one record per route.
+    """
+    logger.info(f"GET REQUEST RECEIVED to export routes as {fmt}")
+    try:
+        check_snapshot_format(fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    return StreamingResponse(
+        export_snapshot(fmt, include_deleted),
+        media_type=SNAPSHOT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="routes.{fmt}"'}
+    )
+
+
+def _request_chunks(request: Request) -> Iterator[bytes]:
+    """
+    Reads the request body chunk by chunk from a worker thread.
+    """
+    stream = request.stream()
+    while True:
+        try:
+            yield anyio.from_thread.run(stream.__anext__)
+        except StopAsyncIteration:
+            return
+
+
+@routes.post("/import", dependencies=[Depends(bearer_token), Depends(require_ready)])
+@profiled
+def routes_import(
+    request: Request,
+    fmt: Annotated[Literal["ndjson", "msgpack"], Query(alias="format")] = "ndjson",
+    on_conflict: Literal["skip", "replace"] = "skip",
+    apply: bool = True
+) -> dict:
+    """
+    Restores a snapshot produced by `GET /routes/export`. Records are bulk inserted
+    and active routes are then applied to the system in a single pass.
+
+    Args:
+        fmt (str): Snapshot format, "ndjson" or "msgpack".
+        on_conflict (str): Keep ("skip") or overwrite ("replace") stored routes with the same destination.
+        apply (bool): Apply active routes to the system after the import.
+
+    Returns:
+        dict: Imported record counts and the routes that could not be applied to the system.
+    """
+    logger.info(f"POST REQUEST RECEIVED to import {fmt} snapshot")
+    try:
+        check_snapshot_format(fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    try:
+        result = import_snapshot(_request_chunks(request), fmt, replace=on_conflict == "replace", apply=apply)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Invalid snapshot: {e}")
+        raise HTTPException(status_code=422, detail=f"Invalid snapshot: {e}")
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while importing snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Database error while importing snapshot: {str(e)}")
+    except subprocess.CalledProcessError as e:
+        raise HTTPException(status_code=500, detail=f"Snapshot stored but not applied to the system: {e.stderr.strip()}")
+
+    return JSONResponse(content=result, status_code=200)
+
+
+@routes.patch("/pause", dependencies=[Depends(bearer_token), Depends(require_ready)])
+@profiled
 def pause_route(to: Annotated[IPvAnyNetwork, Body(embed=True)]) -> dict[str, str]:
     """
     Pauses an active route by deactivating it in the database and removing it from the system.
@@ -197,23 +380,19 @@ def pause_route(to: Annotated[IPvAnyNetwork, Body(embed=True)]) -> dict[str, str
     logger.info(f"PATCH REQUEST RECEIVED to pause route {to}")
 
     try:
-        database_routes = get_routes_from_database()
-        route = next((r for r in database_routes if r["to"] == str(to)), None)
+        route = get_route_from_database(str(to))
 
         if not route:
             raise HTTPException(status_code=404, detail=f"Route {to} not found in the database.")
 
-        now = datetime.now(timezone.utc)
-        is_active_period = route["create_at"] and datetime.fromisoformat(route["create_at"]) <= now \
-            and (not route["delete_at"] or datetime.fromisoformat(route["delete_at"]) > now)
+        is_active_period = is_in_active_period(route, clock.now())
 
         if route["status"] != "active" or not route["active"] or not is_active_period:
             raise HTTPException(status_code=409, detail=f"Route {to} is not currently active and cannot be paused.")
 
         # Remove from system and update DB
         delete_route_from_system(str(to))
-        deactivate_route_in_database(str(to))
-        update_route_status(str(to), "paused")
+        set_routes_state_in_database([str(to)], active=False, status="paused")
 
         return JSONResponse(
             content={"message": f"Route {to} successfully paused"},
@@ -225,7 +404,8 @@ def pause_route(to: Annotated[IPvAnyNetwork, Body(embed=True)]) -> dict[str, str
         raise HTTPException(status_code=500, detail="Internal server error while pausing route.")
 
 
-@routes.patch("/activate", dependencies=[Depends(bearer_token)])
+@routes.patch("/activate", dependencies=[Depends(bearer_token), Depends(require_ready)])
+@profiled
 def activate_route(to: Annotated[IPvAnyNetwork, Body(embed=True)]) -> dict[str, str]:
     """
     Reactivates a paused route by setting it to active in the database and applying it to the system.
@@ -239,15 +419,12 @@ def activate_route(to: Annotated[IPvAnyNetwork, Body(embed=True)]) -> dict[str,
     logger.info(f"PATCH REQUEST RECEIVED to activate route {to}")
 
     try:
-        database_routes = get_routes_from_database()
-        route = next((r for r in database_routes if r["to"] == str(to)), None)
+        route = get_route_from_database(str(to))
 
         if not route:
             raise HTTPException(status_code=404, detail=f"Route {to} not found in the database.")
 
-        now = datetime.now(timezone.utc)
-        is_active_period = route["create_at"] and datetime.fromisoformat(route["create_at"]) <= now \
-            and (not route["delete_at"] or datetime.fromisoformat(route["delete_at"]) > now)
+        is_active_period = is_in_active_period(route, clock.now())
 
         if route["status"] != "paused" or route["active"] or not is_active_period:
             raise HTTPException(status_code=409, detail=f"Route {to} is not currently paused or out of active period.")
@@ -255,8 +432,7 @@ def activate_route(to: Annotated[IPvAnyNetwork, Body(embed=True)]) -> dict[str,
         # Add to system and update DB
         route_obj = Route(**route)
         add_route_to_system(route_obj)
-        activate_route_in_database(str(to))
-        update_route_status(str(to), "active")
+        set_routes_state_in_database([str(to)], active=True, status="active")
 
         return JSONResponse(
             content={"message": f"Route {to} successfully re-activated"},
@@ -1,9 +1,9 @@
 # app/schemas/routes.py
-import psutil
 from pydantic import BaseModel, Field, model_validator
 from pydantic.networks import IPvAnyNetwork, IPvAnyAddress
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Optional
+from app.core import clock
 
 class Route(BaseModel):
     to: IPvAnyNetwork = Field(..., description="Destination network or IP Address (e.g. 192.168.1.24, 192.168.1.0/24)")
@@ -12,13 +12,14 @@ class Route(BaseModel):
     create_at: Optional[datetime] = Field(None, description="Timestamp of scheduled route creation")
     delete_at: Optional[datetime] = Field(None, description="Timestamp of scheduled route deletion")
     status: Optional[str] = Field(None, description="Status of the route (e.g. active, expired)")
+    group: Optional[str] = Field(None, description="Group (e.g. tenant or slice) the route belongs to")
 
     @model_validator(mode='before')
     def convert_empty_fields_to_none(cls, values):
         """
-        Converts empty strings in 'via', 'dev', and 'delete_at' to None to avoid validation errors.
+        Converts empty strings in 'via', 'dev', 'delete_at' and 'group' to None to avoid validation errors.
         """
-        for field in ["via", "dev", "delete_at"]:
+        for field in ["via", "dev", "delete_at", "group"]:
             if field in values and values[field] == "":
                 values[field] = None
         return values
@@ -31,6 +32,7 @@ class Route(BaseModel):
 
     @model_validator(mode='after')
     def check_dev_exists(cls, values):
+        import psutil  # Deferred: only needed when a route is validated, keeps startup imports light
         valid_interfaces =  psutil.net_if_addrs().keys()
         if values.dev and values.dev not in valid_interfaces:
             raise ValueError(f"Route dev: '{values.dev}' is not a valid network interface. Valid interfaces are: {list(valid_interfaces)}")
@@ -39,7 +41,7 @@ class Route(BaseModel):
     @model_validator(mode='after')
     def check_create_at(cls, values):
         if not values.create_at:
-            values.create_at = datetime.now(timezone.utc)
+            values.create_at = clock.now()
         elif values.create_at.tzinfo is None:
             raise ValueError(f"Route create_at timestamp: '{values.create_at}' must include timezone information")
         return values
@@ -49,7 +51,7 @@ class Route(BaseModel):
         if values.delete_at:
             if values.delete_at.tzinfo is None:
                 raise ValueError(f"Route create_at timestamp: '{values.delete_at}' must include timezone information")
-            elif values.delete_at < datetime.now(timezone.utc):
+            elif values.delete_at < clock.now():
                 raise ValueError(f"Route delete_at timestamp: '{values.delete_at}' has already passed")
             elif values.delete_at < values.create_at:
                 raise ValueError(f"Route delete_at timestamp: '{values.delete_at}' can't be set before create_at or present time")
@@ -63,3 +65,4 @@ class RouteUpdate(BaseModel):
     dev: Optional[str] = None
     create_at: Optional[datetime] = None
     delete_at: Optional[datetime] = None
+    group: Optional[str] = None
@@ -1,7 +1,9 @@
 # app/auth.py
 import logging
+from typing import Optional
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.security.utils import get_authorization_scheme_param
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -24,3 +26,18 @@ def bearer_token(credentials: HTTPAuthorizationCredentials = Depends(security))
     if credentials.credentials != settings.APITOKEN:
         logger.warning("Invalid or expired token")
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+
+def is_authorized(authorization: Optional[str]) -> bool:
+    """
+    Checks an HTTP Authorization header as `bearer_token` does, for code that runs
+    before the route dependencies (middlewares).
+
+    Args:
+        authorization (Optional[str]): The raw Authorization header, if any.
+
+    Returns:
+        bool: True if it carries the expected Bearer token.
+    """
+    scheme, token = get_authorization_scheme_param(authorization)
+    return scheme.lower() == "bearer" and token == settings.APITOKEN
@@ -0,0 +1,144 @@
+# app/services/fake_kernel.py
+import ipaddress
+import subprocess
+import threading
+from typing import Optional
+
+
+class FakeKernel:
+    """
+    In-memory stand-in for the `ip` command (iproute2), used by simulations and to run
+    the API without touching the host routing table (KERNEL_BACKEND="fake").
+
+    Supports `ip route add|replace|del|show` (with the to/root/match, dev, table and proto
+    filters of `show`) and `ip -force -batch -`, with the error messages and exit codes of
+    iproute2. Routes live in the main table. It is called like `subprocess.run`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.routes: dict[str, dict[str, Optional[str]]] = {}
+        self.calls: int = 0
+
+    def __call__(self, command: list[str], input: Optional[str] = None, check: bool = False, **kwargs) -> subprocess.CompletedProcess:
+        options = [arg for arg in command[1:] if arg.startswith("-")]
+        args = [arg for arg in command[1:] if not arg.startswith("-")]
+
+        if command[:1] != ["ip"]:
+            returncode, stdout, stderr = 1, "", f"FakeKernel: unsupported command {command[0]!r}\n"
+        elif "-batch" in options:
+            returncode, stdout, stderr = self._batch((input or "").splitlines(), force="-force" in options)
+        else:
+            returncode, stdout, stderr = self._execute(args)
+
+        if check and returncode != 0:
+            raise subprocess.CalledProcessError(returncode, command, stdout, stderr)
+        return subprocess.CompletedProcess(command, returncode, stdout, stderr)
+
+    def _batch(self, lines: list[str], force: bool) -> tuple[int, str, str]:
+        returncode, output, errors = 0, [], []
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            code, stdout, stderr = self._execute(line.split())
+            output.append(stdout)
+            if code != 0:
+                returncode = 1
+                errors.append(f"{stderr}Command failed -:{line_number}\n")
+                if not force:
+                    break
+        return returncode, "".join(output), "".join(errors)
+
+    def _execute(self, args: list[str]) -> tuple[int, str, str]:
+        if len(args) < 2 or args[0] != "route":
+            return 1, "", f"FakeKernel: unsupported arguments {' '.join(args)!r}\n"
+        action, spec = args[1], args[2:]
+
+        if action in ("show", "list"):
+            return self._show(spec)
+
+        if spec and spec[0] not in ("to", "via", "dev", "proto"):
+            spec = ["to", *spec]
+        selector = dict(zip(spec[::2], spec[1::2]))
+        try:
+            to = self.normalize(selector.get("to", ""))
+        except ValueError:
+            return 1, "", f"Error: any valid prefix is expected rather than \"{selector.get('to', '')}\".\n"
+
+        with self._lock:
+            self.calls += 1
+            if action == "add":
+                if to in self.routes:
+                    return 2, "", "RTNETLINK answers: File exists\n"
+                self.routes[to] = {"via": selector.get("via"), "dev": selector.get("dev"), "proto": selector.get("proto", "boot")}
+            elif action == "replace":
+                self.routes[to] = {"via": selector.get("via"), "dev": selector.get("dev"), "proto": selector.get("proto", "boot")}
+            elif action in ("del", "delete"):
+                if self.routes.pop(to, None) is None:
+                    return 2, "", "RTNETLINK answers: No such process\n"
+            else:
+                return 1, "", f"Command \"{action}\" is unknown, try \"ip route help\".\n"
+        return 0, "", ""
+
+    @staticmethod
+    def normalize(to: str) -> str:
+        """
+        Returns a destination as printed by `ip route show` (host routes without prefix length).
+        """
+        network = ipaddress.ip_network(to)
+        return str(network.network_address) if network.prefixlen == network.max_prefixlen else str(network)
+
+    def _show(self, spec: list[str]) -> tuple[int, str, str]:
+        filters: dict[str, str] = {}
+        selector: Optional[tuple[str, ipaddress.IPv4Network | ipaddress.IPv6Network]] = None
+        words = iter(spec)
+        for word in words:
+            value = next(words, None)
+            if value is None:
+                return 255, "", "Command line is not complete. Try option \"help\"\n"
+            if word == "to":
+                kind = value if value in ("exact", "root", "match") else "exact"
+                prefix = next(words, "") if value in ("exact", "root", "match") else value
+                try:
+                    selector = (kind, ipaddress.ip_network(prefix, strict=False))
+                except ValueError:
+                    return 1, "", f"Error: any valid prefix is expected rather than \"{prefix}\".\n"
+            elif word in ("dev", "table", "proto"):
+                filters[word] = value
+            else:
+                return 255, "", f"Error: argument \"{word}\" is wrong: unknown selector\n"
+
+        if filters.get("table", "main") not in ("main", "254", "all", "0"):
+            return 0, "", ""
+
+        with self._lock:
+            routes = list(self.routes.items())
+        lines = []
+        for to, route in routes:
+            if "dev" in filters and route["dev"] != filters["dev"]:
+                continue
+            if "proto" in filters and route["proto"] != filters["proto"]:
+                continue
+            if selector:
+                kind, prefix = selector
+                network = ipaddress.ip_network(to)
+                if network.version != prefix.version:
+                    continue
+                if kind == "exact" and network != prefix or kind == "root" and not network.subnet_of(prefix) \
+                        or kind == "match" and not network.supernet_of(prefix):
+                    continue
+            words = [to]
+            words.extend(["via", route["via"]]) if route["via"] else words
+            # Like iproute2, keys used as filters are not repeated in the output
+            words.extend(["dev", route["dev"]]) if route["dev"] and "dev" not in filters else words
+            words.extend(["proto", route["proto"]]) if route["proto"] != "boot" and "proto" not in filters else words
+            lines.append(" ".join(words) + (" scope link" if not route["via"] else ""))
+        return 0, "\n".join(lines) + ("\n" if lines else ""), ""
+
+    def reset(self) -> None:
+        with self._lock:
+            self.routes.clear()
+            self.calls = 0
+
+
+fake_kernel = FakeKernel()
@@ -0,0 +1,136 @@
+# app/services/groups.py
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from app.core import clock
+from app.core.tracing import traced
+from app.db.routes import delete_routes_from_database, set_routes_state_in_database, update_routes_delete_at_in_database
+from app.services.routes import add_routes_to_system, apply_routes_to_system, is_in_active_period, remove_routes_from_system
+
+logger = logging.getLogger(__name__)
+
+
+def _result(to: str, result: str, detail: Optional[str] = None) -> dict:
+    return {"to": to, "result": result, "detail": detail}
+
+
+@traced()
+def pause_group_routes(routes: list[dict]) -> list[dict]:
+    """
+    Pauses the currently active routes of a group: removes them from the system in a
+    single `ip -batch` pass and marks them as paused in a single database transaction.
+    If the database update fails, the removed routes are restored in the system.
+
+    Args:
+        routes (list[dict]): The routes of the group.
+
+    Returns:
+        list[dict]: Per-route results with keys "to", "result" ("paused", "skipped" or "failed") and "detail".
+    """
+    now = clock.now()
+    results: list[dict] = []
+    eligible: list[dict] = []
+    for route in routes:
+        if route["status"] != "active" or not route["active"] or not is_in_active_period(route, now):
+            results.append(_result(route["to"], "skipped", "Route is not currently active"))
+        else:
+            eligible.append(route)
+
+    failures = remove_routes_from_system([route["to"] for route in eligible])
+    paused = [route for route in eligible if route["to"] not in failures]
+    try:
+        set_routes_state_in_database([route["to"] for route in paused], active=False, status="paused")
+    except Exception:
+        apply_routes_to_system(paused)
+        raise
+
+    results.extend(
+        _result(route["to"], "failed", failures[route["to"]]) if route["to"] in failures else _result(route["to"], "paused")
+        for route in eligible
+    )
+    return results
+
+
+@traced()
+def activate_group_routes(routes: list[dict]) -> list[dict]:
+    """
+    Reactivates the paused routes of a group that are within their active period: adds
+    them to the system in a single `ip -batch` pass (without overwriting other routes to
+    the same destinations) and marks them as active in a single database transaction.
+    If the database update fails, the added routes are removed from the system again.
+
+    Args:
+        routes (list[dict]): The routes of the group.
+
+    Returns:
+        list[dict]: Per-route results with keys "to", "result" ("activated", "skipped" or "failed") and "detail".
+    """
+    now = clock.now()
+    results: list[dict] = []
+    eligible: list[dict] = []
+    for route in routes:
+        if route["status"] != "paused" or route["active"] or not is_in_active_period(route, now):
+            results.append(_result(route["to"], "skipped", "Route is not currently paused or out of active period"))
+        else:
+            eligible.append(route)
+
+    failures = add_routes_to_system(eligible)
+    activated = [route["to"] for route in eligible if route["to"] not in failures]
+    try:
+        set_routes_state_in_database(activated, active=True, status="active")
+    except Exception:
+        remove_routes_from_system(activated)
+        raise
+
+    results.extend(
+        _result(route["to"], "failed", failures[route["to"]]) if route["to"] in failures else _result(route["to"], "activated")
+        for route in eligible
+    )
+    return results
+
+
+@traced()
+def delete_group_routes(routes: list[dict]) -> list[dict]:
+    """
+    Deletes every route of a group: moves them to Deleted_Routes in a single database
+    transaction, then removes the installed ones from the system in a single `ip -batch` pass.
+
+    Args:
+        routes (list[dict]): The routes of the group.
+
+    Returns:
+        list[dict]: Per-route results with keys "to", "result" ("deleted") and "detail"
+        (set if the route could not be removed from the system).
+    """
+    deleted = delete_routes_from_database([route["to"] for route in routes], "deleted")
+    failures = remove_routes_from_system([route["to"] for route in deleted if route["active"]])
+
+    return [
+        _result(route["to"], "deleted", f"System error: {failures[route['to']]}" if route["to"] in failures else None)
+        for route in deleted
+    ]
+
+
+@traced()
+def extend_group_routes(routes: list[dict], delete_at: datetime) -> list[dict]:
+    """
+    Reschedules the deletion of every route of a group to `delete_at` in a single database transaction.
+
+    Args:
+        routes (list[dict]): The routes of the group.
+        delete_at (datetime): The new (timezone-aware, future) deletion time.
+
+    Returns:
+        list[dict]: Per-route results with keys "to", "result" ("extended" or "skipped") and "detail".
+    """
+    results: list[dict] = []
+    eligible: list[str] = []
+    for route in routes:
+        if route["create_at"] and datetime.fromisoformat(route["create_at"]) >= delete_at:
+            results.append(_result(route["to"], "skipped", "delete_at must be after the route's create_at"))
+        else:
+            eligible.append(route["to"])
+
+    update_routes_delete_at_in_database(eligible, delete_at.astimezone(timezone.utc))
+    results.extend(_result(to, "extended") for to in eligible)
+    return results
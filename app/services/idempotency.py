@@ -0,0 +1,245 @@
+# app/services/idempotency.py
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from app.core import clock
+from app.core.config import settings
+from app.db.idempotency import get_idempotency_record_from_database, store_idempotency_record_in_database
+from app.services.auth import is_authorized
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MUTATING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+MAX_KEY_LENGTH = 255
+# Bodies are read in memory to be fingerprinted: larger (or streamed) bodies, such as
+# snapshot imports, can't be sent with an Idempotency-Key
+FINGERPRINT_BODY_LIMIT = 64 * 1024
+
+
+class StoredResponse:
+    """
+    Response to a request made with an Idempotency-Key.
+    """
+    __slots__ = ("fingerprint", "status_code", "headers", "body", "expires_at")
+
+    def __init__(self, fingerprint: str, status_code: int, headers: dict[str, str], body: bytes, expires_at: float):
+        self.fingerprint = fingerprint
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+    def to_record(self, key: str) -> dict:
+        return {
+            "key": key,
+            "fingerprint": self.fingerprint,
+            "status_code": self.status_code,
+            "headers": json.dumps(self.headers),
+            "body": self.body,
+            "expires_at": self.expires_at,
+        }
+
+    @classmethod
+    def from_record(cls, record: dict) -> "StoredResponse":
+        return cls(record["fingerprint"], record["status_code"], json.loads(record["headers"]), record["body"], record["expires_at"])
+
+
+class IdempotencyCache:
+    """
+    Bounded LRU of responses to mutating requests, keyed by Idempotency-Key, with TTL
+    eviction. Optionally written through to the database (IDEMPOTENCY_PERSIST), so
+    responses are still replayed after a restart.
+    Also tracks the keys of requests still being processed.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, persist: bool) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, StoredResponse] = OrderedDict()
+        self._in_flight: set[str] = set()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist = persist
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        """
+        Returns the stored response for `key` if it is in memory and has not expired.
+        """
+        now = clock.now().timestamp()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def load(self, key: str) -> Optional[StoredResponse]:
+        """
+        Fetches the stored response for `key` from the database (if persistence is enabled)
+        and keeps it in memory. Blocking: call it from a worker thread.
+        """
+        if not self.persist:
+            return None
+        record = get_idempotency_record_from_database(key, clock.now().timestamp())
+        if record is None:
+            return None
+        entry = StoredResponse.from_record(record)
+        with self._lock:
+            self._put(key, entry)
+        return entry
+
+    def begin(self, key: str) -> bool:
+        """
+        Marks the request with `key` as in progress.
+
+        Returns:
+            bool: False if a request with the same key is already in progress.
+        """
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+            return True
+
+    def end(self, key: str) -> None:
+        with self._lock:
+            self._in_flight.discard(key)
+
+    def store(self, key: str, fingerprint: str, status_code: int, headers: dict[str, str], body: bytes) -> StoredResponse:
+        """
+        Stores the response to the request with `key` in memory.
+        """
+        entry = StoredResponse(fingerprint, status_code, headers, body, clock.now().timestamp() + self.ttl)
+        with self._lock:
+            self._put(key, entry)
+        return entry
+
+    def save(self, key: str, entry: StoredResponse) -> None:
+        """
+        Writes a stored response to the database (if persistence is enabled). Blocking: call it from a worker thread.
+        """
+        if self.persist:
+            store_idempotency_record_in_database(entry.to_record(key), clock.now().timestamp())
+
+    def _put(self, key: str, entry: StoredResponse) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        now = clock.now().timestamp()
+        while self._entries:
+            oldest_key, oldest = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and oldest.expires_at > now:
+                break
+            del self._entries[oldest_key]
+
+
+idempotency_cache = IdempotencyCache(settings.IDEMPOTENCY_MAX_ENTRIES, settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_PERSIST)
+
+
+def _fingerprintable(request: Request) -> bool:
+    """
+    Checks whether the whole body of a request can be fingerprinted: it must have no body
+    or declare a Content-Length of at most FINGERPRINT_BODY_LIMIT bytes.
+    """
+    length = request.headers.get("content-length")
+    if length is None:
+        return "transfer-encoding" not in request.headers
+    return length.isdigit() and int(length) <= FINGERPRINT_BODY_LIMIT
+
+
+async def _fingerprint(request: Request) -> str:
+    """
+    Hashes what identifies a request: method, path, query string and body.
+    Only call it for requests accepted by `_fingerprintable`.
+    """
+    digest = hashlib.sha256(f"{request.method} {request.url.path}?{request.url.query}".encode())
+    digest.update(await request.body())
+    return digest.hexdigest()
+
+
+def _replay(stored: StoredResponse, fingerprint: str, key: str, request: Request) -> Response:
+    """
+    Replays a stored response, or rejects the request with 422 if the key was used for a different one.
+    """
+    if stored.fingerprint != fingerprint:
+        logger.warning(f"{IDEMPOTENCY_HEADER} {key} reused for a different request to {request.method} {request.url.path}")
+        return JSONResponse(content={"detail": f"{IDEMPOTENCY_HEADER} was already used for a different request"}, status_code=422)
+    logger.info(f"Replaying stored response for {IDEMPOTENCY_HEADER} {key} ({request.method} {request.url.path})")
+    return Response(content=stored.body, status_code=stored.status_code, headers={**stored.headers, "Idempotent-Replayed": "true"})
+
+
+async def idempotency_middleware(request: Request, call_next):
+    """
+    HTTP middleware that makes mutating requests (POST, PUT, PATCH, DELETE) carrying an
+    Idempotency-Key header safe to retry: the first response is stored and replayed to
+    later requests with the same key, without running validation, database or system
+    operations again. Server errors (5xx) are not stored, so they can be retried.
+
+    Keys are scoped to the Authorization header, and only requests with a valid Bearer
+    token are tracked: the others are left to the route dependencies to reject, and
+    authentication errors (401, 403) are never stored. Reusing a key for a different
+    request is rejected with 422, and a duplicate of a request still in progress with 409.
+    Requests whose body can't be fingerprinted (streamed, or larger than
+    FINGERPRINT_BODY_LIMIT) are rejected with 400 when they carry a key.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key or request.method not in MUTATING_METHODS or not is_authorized(request.headers.get("authorization")):
+        return await call_next(request)
+    if len(key) > MAX_KEY_LENGTH:
+        return JSONResponse(content={"detail": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters"}, status_code=400)
+
+    if not _fingerprintable(request):
+        return JSONResponse(
+            content={"detail": f"{IDEMPOTENCY_HEADER} requires a request body with a Content-Length of at most {FINGERPRINT_BODY_LIMIT} bytes"},
+            status_code=400
+        )
+
+    scoped_key = hashlib.sha256(f"{request.headers.get('authorization', '')}\0{key}".encode()).hexdigest()
+    fingerprint = await _fingerprint(request)
+
+    stored = idempotency_cache.get(scoped_key)
+    if stored is None and idempotency_cache.persist:
+        stored = await asyncio.to_thread(idempotency_cache.load, scoped_key)
+    if stored is not None:
+        return _replay(stored, fingerprint, key, request)
+
+    if not idempotency_cache.begin(scoped_key):
+        logger.warning(f"Request with {IDEMPOTENCY_HEADER} {key} is already in progress")
+        return JSONResponse(
+            content={"detail": f"A request with this {IDEMPOTENCY_HEADER} is already in progress"},
+            status_code=409,
+            headers={"Retry-After": "1"}
+        )
+
+    try:
+        # A duplicate may have completed while this one was loading the key from the database
+        stored = idempotency_cache.get(scoped_key)
+        if stored is not None:
+            return _replay(stored, fingerprint, key, request)
+
+        response = await call_next(request)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+
+        if response.status_code < 500 and response.status_code not in (401, 403):
+            stored = idempotency_cache.store(scoped_key, fingerprint, response.status_code, headers, body)
+            if idempotency_cache.persist:
+                try:
+                    await asyncio.to_thread(idempotency_cache.save, scoped_key, stored)
+                except Exception as e:
+                    logger.error(f"Error persisting response for {IDEMPOTENCY_HEADER} {key}: {e}")
+    finally:
+        idempotency_cache.end(scoped_key)
+
+    return Response(content=body, status_code=response.status_code, headers=headers)
@@ -1,54 +1,84 @@
 import asyncio
 import logging
-from datetime import datetime, timezone
+from datetime import datetime
 from app.services.routes import add_route_to_system, delete_route_from_system
-from app.db.routes import (get_routes_from_database, delete_route_from_database, activate_route_in_database, deactivate_route_in_database, update_route_status)
+from app.db.routes import (get_route_from_database, get_pending_routes_due_from_database, delete_route_from_database, activate_route_in_database, deactivate_route_in_database, update_route_status)
+from app.db.schedule import schedule_index
 from app.schemas.routes import Route
+from app.core import clock
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+def run_lifecycle_tick(now: datetime) -> dict[str, list[dict]]:
+    """
+    Runs one pass of the lifecycle: activates the routes whose create_at has passed and
+    deletes the routes whose delete_at has passed.
+    Only the pending routes whose create_at has passed (kept sorted by the registry) and
+    the routes whose delete_at has passed (from the schedule index) are examined, so a
+    tick costs O(log n + k) in the number of due routes instead of a full table read.
+
+    Args:
+        now (datetime): The reference time of the tick.
+
+    Returns:
+        dict[str, list[dict]]: The routes "activated", "expired" and "failed" during the tick.
+    """
+    outcome: dict[str, list[dict]] = {"activated": [], "expired": [], "failed": []}
+    try:
+        due_routes = {route["to"]: route for route in get_pending_routes_due_from_database(now)}
+        for to in schedule_index.expiring_before(now):
+            route = get_route_from_database(to)
+            if route:
+                due_routes[to] = route
+        database_routes = list(due_routes.values())
+    except Exception as e:
+        logger.error(f"Error fetching routes in lifecycle: {str(e)}")
+        return outcome
+
+    for route in database_routes:
+        # If `delete_at` is set and expired, remove the route  
+        if route["delete_at"] and datetime.fromisoformat(route["delete_at"]) <= now and route["status"] != "expired":
+            logger.info(f"Deleting expired route: {route['to']}", extra={"route": route["to"]})
+            try:
+                delete_route_from_database(route["to"], "expired")
+
+                if route["active"]:
+                    logger.info(f"Removing route {route['to']} from system (route is installed)", extra={"route": route["to"]})
+                    delete_route_from_system(route["to"])
+                else:
+                    logger.info(f"Route {route['to']} was {route['status']}, so not removing from system", extra={"route": route["to"]})
+
+                deactivate_route_in_database(route["to"])
+                outcome["expired"].append(route)
+            except Exception as e:
+                logger.error(f"Error deleting route {route['to']}: {e}", extra={"route": route["to"]})
+                outcome["failed"].append(route)
+
+        # If `create_at` is set, expired, but not yet active, activate it
+        elif (route["create_at"] and datetime.fromisoformat(route["create_at"]) <= now and (not route["delete_at"] or datetime.fromisoformat(route["delete_at"]) > now) and not route["active"] and route["status"] != "paused"):
+            logger.info(f"Activating scheduled route: {route['to']}", extra={"route": route["to"]})
+            try:
+                if activate_route_in_database(route["to"]):
+                    update_route_status(route["to"], "active")
+                    route_obj = Route(**route)
+                    add_route_to_system(route_obj)
+                    outcome["activated"].append(route)
+            except Exception as e:
+                logger.error(f"Error activating route {route['to']}: {e}", extra={"route": route["to"]})
+                outcome["failed"].append(route)
+
+    return outcome
+
+
 async def route_manager_loop():
     """
     Background task that continuously checks and updates the routing system.
-    It activates or deletes routes based on their create_at and delete_at timestamps.
+    It activates or deletes routes based on their create_at and delete_at timestamps
+    every ROUTE_CHECK_INTERVAL seconds of the active clock (see `app.core.clock`).
+    Ticks run in a worker thread: they wait for the database write lock, which may be
+    held by a request handler that needs the event loop to make progress.
     """
     while True:
-        try:
-            database_routes = get_routes_from_database()
-        except Exception as e:
-            logger.error(f"Error fetching routes in lifecycle: {str(e)}")
-            await asyncio.sleep(settings.ROUTE_CHECK_INTERVAL)
-            continue 
-
-        now = datetime.now(timezone.utc)
-
-        for route in database_routes:
-            # If `delete_at` is set and expired, remove the route  
-            if route["delete_at"] and datetime.fromisoformat(route["delete_at"]) <= now and route["status"] != "expired":
-                logger.info(f"Deleting expired route: {route['to']}")
-                try:
-                    delete_route_from_database(route["to"], "expired")
-
-                    if route["status"] != "paused":
-                        logger.info(f"Removing route {route['to']} from system (status is not 'paused')")
-                        delete_route_from_system(route["to"])
-                    else:
-                        logger.info(f"Route {route['to']} was paused, so not removing from system")
-
-                    deactivate_route_in_database(route["to"])
-                except Exception as e:
-                    logger.error(f"Error deleting route {route['to']}: {e}")
-
-            # If `create_at` is set, expired, but not yet active, activate it
-            elif (route["create_at"] and datetime.fromisoformat(route["create_at"]) <= now and (not route["delete_at"] or datetime.fromisoformat(route["delete_at"]) > now) and not route["active"] and route["status"] != "paused"):
-                logger.info(f"Activating scheduled route: {route['to']}")
-                try:
-                    if activate_route_in_database(route["to"]):
-                        update_route_status(route["to"], "active")
-                        route_obj = Route(**route)
-                        add_route_to_system(route_obj)
-                except Exception as e:
-                    logger.error(f"Error activating route {route['to']}: {e}")
-
-        await asyncio.sleep(settings.ROUTE_CHECK_INTERVAL)
+        await asyncio.to_thread(run_lifecycle_tick, clock.now())
+        await clock.sleep(settings.ROUTE_CHECK_INTERVAL)
@@ -1,46 +1,195 @@
 # app/services/routes.py
+import ipaddress
 import logging
 import json
 import subprocess
-from datetime import datetime, timezone
+from datetime import datetime
+from typing import Callable, Optional
 from fastapi import HTTPException
-from pydantic import ValidationError
-from app.db.routes import get_routes_from_database
-from app.services.utils  import run_command
-from app.schemas.routes import Route
+from sqlalchemy.orm.exc import NoResultFound
+from app.core import clock
+from app.core.config import settings
+from app.core.tracing import traced
+from app.db.routes import get_active_routes_from_database, get_route_from_database, get_routes_by_dev_from_database, get_routes_from_database, update_route_in_database, write_lock
+from app.db.schedule import to_timestamp
+from app.services.utils  import run_batch_command, run_command
+from app.schemas.routes import Route, RouteUpdate
 
 logger = logging.getLogger(__name__)
 
+# Routes applied per `ip -batch` process when loading the database into the system at startup
+RECONCILE_BATCH_SIZE = 1000
 
-def load_database_routes_to_system() -> None:
+
+def load_database_routes_to_system(database_routes: Optional[list[dict]] = None, progress: Optional[Callable[[int, int], None]] = None) -> None:
     """
-    Load active routes from the database and applies them to the system.
+    Load active routes from the database and applies them to the system, RECONCILE_BATCH_SIZE
+    routes per `ip -batch` process. Routes are installed with `route replace`, so routes that
+    already exist (e.g. installed before a restart or an upgrade) are taken over and tagged
+    with ROUTE_PROTO instead of failing with "File exists".
+
+    Args:
+        database_routes (list[dict], optional): Routes already fetched from the database. Fetched if omitted.
+        progress (Callable[[int, int], None], optional): Called with (processed, total) after each batch.
     """
     logger.info("LOAD ACTIVE ROUTES FROM THE DATABASE TO THE SYSTEM")
-    try:
-        database_routes: list[dict] = get_routes_from_database()
-    except:
-        raise HTTPException(status_code=500, detail="Error fetching routes from database")
+    if database_routes is None:
+        try:
+            database_routes = get_routes_from_database()
+        except:
+            raise HTTPException(status_code=500, detail="Error fetching routes from database")
 
-    for route in database_routes:
+    total = len(database_routes)
+    for start in range(0, total, RECONCILE_BATCH_SIZE):
+        batch = database_routes[start:start + RECONCILE_BATCH_SIZE]
 
         # TODO: function that checks if a route EXPIRED and deletes it
         # TODO: function that checks if a route BEGAN and modifies active from it
 
-        if route["active"]:
-            try:
-                add_route_to_system(Route(**route))
+        failures = apply_routes_to_system([route for route in batch if route["active"]])
+        for to, message in failures.items():
+            logger.error(f"Error loading route to {to} into the system: {message}", extra={"route": to})
 
-            except (ValidationError, ValueError, TypeError) as e:
-                logger.error(f"Error impoting route from database: {route}")
-                logger.error(f"Error details: {e}")
-            except subprocess.CalledProcessError as e:
-                if "RTNETLINK answers: File exists" in e.stderr.strip():
-                    logger.warning(f"Route from database to {route["to"]} already existed in the system")
-                    return
-                raise HTTPException(status_code=500, detail=f"{e.stderr.strip()}")
+        if progress:
+            progress(start + len(batch), total)
+
+
+def route_spec(to: str, via: Optional[object] = None, dev: Optional[str] = None) -> list[str]:
+    """
+    Builds the `ip route` arguments of a route installed by this service (to, via, dev),
+    tagged with the ROUTE_PROTO protocol number so managed routes can be queried apart.
+    """
+    spec: list[str] = ["to", to]
+    spec.extend(["via", str(via)]) if via else spec
+    spec.extend(["dev", dev]) if dev else spec
+    spec.extend(["proto", str(settings.ROUTE_PROTO)])
+    return spec
+
+
+@traced()
+def get_system_routes(to: Optional[str] = None, root: Optional[str] = None, match: Optional[str] = None,
+                      dev: Optional[str] = None, table: Optional[str] = None, managed: bool = False) -> list[str]:
+    """
+    Lists routes of the system with `ip route show`, passing the filters to the kernel
+    instead of dumping and filtering the whole table.
+
+    Args:
+        to (str, optional): Only the route to exactly this prefix.
+        root (str, optional): Only routes within this prefix (prefixes not shorter than it).
+        match (str, optional): Only routes containing this prefix or address (prefixes not longer than it).
+        dev (str, optional): Only routes through this output device.
+        table (str, optional): Routing table to read ("main", "local", "all" or a table ID). Defaults to main.
+        managed (bool): Only routes installed by this service (tagged with ROUTE_PROTO).
 
+    Returns:
+        list[str]: One line of `ip route show` output per route.
+
+    Raises:
+        ValueError: If more than one of `to`, `root` and `match` is given.
+        subprocess.CalledProcessError: If the query fails (e.g. unknown device or table).
+    """
+    selectors = [(kind, prefix) for kind, prefix in (("exact", to), ("root", root), ("match", match)) if prefix]
+    if len(selectors) > 1:
+        raise ValueError("Only one of 'to', 'root' and 'match' can be used")
+
+    command: list[str] = ["ip", "route", "show"]
+    if table:
+        command.extend(["table", table])
+    if selectors:
+        command.extend(["to", *selectors[0]])
+    if dev:
+        command.extend(["dev", dev])
+    if managed:
+        command.extend(["proto", str(settings.ROUTE_PROTO)])
+
+    return [line.strip() for line in run_command(command).splitlines()]
+
+
+def get_database_routes(to: Optional[str] = None, root: Optional[str] = None, match: Optional[str] = None,
+                        dev: Optional[str] = None) -> list[dict]:
+    """
+    Lists stored routes with the same filters as `get_system_routes`.
+
+    Args:
+        to (str, optional): Only the route to exactly this prefix.
+        root (str, optional): Only routes within this prefix.
+        match (str, optional): Only routes containing this prefix or address.
+        dev (str, optional): Only routes through this output device.
+
+    Returns:
+        list[dict]: The matching routes.
+    """
+    if to:
+        route = get_route_from_database(to)
+        routes = [route] if route else []
+    elif dev:
+        routes = get_routes_by_dev_from_database(dev)
+    else:
+        routes = get_routes_from_database()
+
+    if dev:
+        routes = [route for route in routes if route["dev"] == dev]
+    if root or match:
+        prefix = ipaddress.ip_network(root or match, strict=False)
+        contains = (lambda network: network.subnet_of(prefix)) if root else (lambda network: network.supernet_of(prefix))
+        routes = [
+            route for route in routes
+            if (network := ipaddress.ip_network(route["to"], strict=False)).version == prefix.version and contains(network)
+        ]
+    return routes
+
+
+@traced()
+def apply_routes_to_system(routes: list[dict]) -> dict[str, str]:
+    """
+    Installs (or replaces) many routes in the system with a single `ip -batch` process.
+
+    Args:
+        routes (list[dict]): Routes with keys to, via and dev.
+
+    Returns:
+        dict[str, str]: Error message of each route that could not be applied, keyed by destination.
+    """
+    if not routes:
+        return {}
+    lines = [" ".join(["route", "replace", *route_spec(r["to"], r["via"], r["dev"])]) for r in routes]
+    failures = run_batch_command(["ip", "-force", "-batch", "-"], lines)
+    logger.info(f"Applied {len(routes) - len(failures)} of {len(routes)} routes to the system")
+    return {routes[line - 1]["to"]: message for line, message in failures.items()}
+
+
+@traced()
+def add_routes_to_system(routes: list[dict]) -> dict[str, str]:
+    """
+    Adds many routes to the system with a single `ip -batch` process. Unlike
+    `apply_routes_to_system`, an existing route to the same destination (e.g. one not
+    managed by this API) is kept and reported as a failure ("File exists").
+
+    Args:
+        routes (list[dict]): Routes with keys to, via and dev.
+
+    Returns:
+        dict[str, str]: Error message of each route that could not be added, keyed by destination.
+    """
+    if not routes:
+        return {}
+    lines = [" ".join(["route", "add", *route_spec(r["to"], r["via"], r["dev"])]) for r in routes]
+    failures = run_batch_command(["ip", "-force", "-batch", "-"], lines)
+    logger.info(f"Added {len(routes) - len(failures)} of {len(routes)} routes to the system")
+    return {routes[line - 1]["to"]: message for line, message in failures.items()}
+
+
+def reconcile_database_routes_to_system() -> dict[str, str]:
+    """
+    Applies every active route stored in the database to the system in one kernel pass.
+
+    Returns:
+        dict[str, str]: Error message of each route that could not be applied, keyed by destination.
+    """
+    return apply_routes_to_system(get_active_routes_from_database())
 
+
+@traced()
 def add_route_to_system(route: Route) -> bool:
     """
     Adds a route to the system using the `ip route add` command.
@@ -51,20 +200,38 @@ def add_route_to_system(route: Route) -> bool:
     Returns:
         bool: True if the route was added successfully, False otherwise.
     """
-    logger.info("Adding route to system...")
-    command: list[str] = ["ip", "route", "add", "to", str(route.to)]
-    command.extend(["via", str(route.via)]) if route.via else command
-    command.extend(["dev", route.dev]) if route.dev else command
+    logger.debug("Adding route to system...")
+    command: list[str] = ["ip", "route", "add", *route_spec(str(route.to), route.via, route.dev)]
 
     try:
         run_command(command) 
     except subprocess.CalledProcessError:
         raise
     
-    logger.info(f"Route to {route.to} added to system successfully")
+    logger.info(f"Route to {route.to} added to system successfully", extra={"route": str(route.to)})
+    return True
+
+
+@traced()
+def replace_route_in_system(route: Route) -> bool:
+    """
+    Installs a route in the system, atomically replacing any existing route to the
+    same destination, using the `ip route replace` command.
+
+    Args:
+        route (Route): A Route object containing to, via, dev, create_at, and delete_at.
+
+    Returns:
+        bool: True if the route was replaced successfully, False otherwise.
+    """
+    logger.debug("Replacing route in system...")
+    run_command(["ip", "route", "replace", *route_spec(str(route.to), route.via, route.dev)])
+
+    logger.info(f"Route to {route.to} replaced in system successfully", extra={"route": str(route.to)})
     return True
 
 
+@traced()
 def delete_route_from_system(to: str) -> bool:
     """
     Deletes a route from the system using the `ip` command.
@@ -75,11 +242,127 @@ def delete_route_from_system(to: str) -> bool:
     Returns:
         bool: True if the route was deleted successfully, False otherwise.
     """
-    logger.info("Deleting route from system...")
+    logger.debug("Deleting route from system...")
     try:
         run_command(["ip", "route", "del", "to", to])
     except subprocess.CalledProcessError:
         raise
     
-    logger.info(f"Route to {to} deleted from system successfully")
+    logger.info(f"Route to {to} deleted from system successfully", extra={"route": to})
     return True
+
+
+@traced()
+def remove_routes_from_system(tos: list[str]) -> dict[str, str]:
+    """
+    Deletes many routes from the system with a single `ip -batch` process.
+    Routes that are already absent from the system are not reported as failures.
+
+    Args:
+        tos (list[str]): The destination IP Addresses/Networks of the routes to delete.
+
+    Returns:
+        dict[str, str]: Error message of each route that could not be deleted, keyed by destination.
+    """
+    if not tos:
+        return {}
+    failures = run_batch_command(["ip", "-force", "-batch", "-"], [f"route del to {to}" for to in tos])
+    failures = {tos[line - 1]: message for line, message in failures.items() if "No such process" not in message}
+    logger.info(f"Deleted {len(tos) - len(failures)} of {len(tos)} routes from the system")
+    return failures
+
+
+def is_in_active_period(route: dict, now: datetime) -> bool:
+    """
+    Checks whether `now` falls within the scheduled lifetime [create_at, delete_at) of a stored route.
+
+    Args:
+        route (dict): A route as returned by `get_route_from_database`.
+        now (datetime): The (timezone-aware) reference time.
+    """
+    return bool(route["create_at"]) and datetime.fromisoformat(route["create_at"]) <= now \
+        and (not route["delete_at"] or datetime.fromisoformat(route["delete_at"]) > now)
+
+
+def route_update_changes(route: dict, route_update: RouteUpdate) -> dict:
+    """
+    Computes the fields of a stored route actually modified by an update:
+    - 'via' and 'dev' are mutually exclusive (if one is updated, the other is removed).
+    - 'create_at' and 'delete_at' can be updated separately.
+    - an empty 'group' removes the route from its group.
+
+    Args:
+        route (dict): The stored route, as returned by `get_route_from_database`.
+        route_update (RouteUpdate): The requested update.
+
+    Returns:
+        dict: The new value of each modified field (empty if the update is a no-op).
+    """
+    requested: dict = {}
+    if route_update.via is not None:
+        requested.update(via=str(route_update.via), dev=None)
+    elif route_update.dev is not None:
+        requested.update(via=None, dev=route_update.dev)
+    if route_update.group is not None:
+        requested["group"] = route_update.group or None
+
+    changes = {field: value for field, value in requested.items() if value != route[field]}
+    for field in ("create_at", "delete_at"):
+        value = getattr(route_update, field)
+        if value is not None and to_timestamp(value) != to_timestamp(route[field]):
+            changes[field] = value
+    return changes
+
+
+@traced()
+def update_route(route: dict, route_update: RouteUpdate) -> Optional[str]:
+    """
+    Updates a stored route, make-before-break:
+    - no-op updates are skipped;
+    - schedule and group changes are stored without touching the system;
+    - a new next hop of an installed route is applied with `ip route replace` before
+      it is stored, so traffic keeps flowing through the old or the new next hop;
+    - an installed route whose create_at moves to the future is removed and becomes pending.
+    If the database update fails, the previous route is restored in the system.
+    The route is read again and updated under the database write lock, so a concurrent
+    activation or deactivation can't be overwritten by a decision made on a stale state.
+
+    Args:
+        route (dict): The stored route, as returned by `get_route_from_database`.
+        route_update (RouteUpdate): The requested update.
+
+    Returns:
+        Optional[str]: The status of the route after the update, or None if nothing changed.
+
+    Raises:
+        NoResultFound: If the route was removed in the meantime.
+        ValueError: If the updated route is not valid.
+        subprocess.CalledProcessError: If the system rejects the updated route.
+    """
+    with write_lock:
+        route = get_route_from_database(route["to"])
+        if route is None:
+            raise NoResultFound(f"Route {route_update.to} not found in the database.")
+
+        changes = route_update_changes(route, route_update)
+        if not changes:
+            logger.info(f"Route {route['to']} unchanged, update skipped", extra={"route": route["to"]})
+            return None
+
+        updated = Route(**{**route, **changes})
+        now = clock.now()
+
+        status, active = route["status"], route["active"]
+        if route["active"] and updated.create_at > now:
+            delete_route_from_system(route["to"])
+            status, active = "pending", False
+        elif route["active"] and ("via" in changes or "dev" in changes):
+            replace_route_in_system(updated)
+
+        try:
+            update_route_in_database(route["to"], changes, status, active)
+        except Exception:
+            if route["active"] and (not active or "via" in changes or "dev" in changes):
+                apply_routes_to_system([route])
+            raise
+        return status
@@ -0,0 +1,124 @@
+# app/services/snapshot.py
+import json
+import logging
+from typing import Iterable, Iterator
+from app.db.routes import get_active_routes_from_database, import_snapshot_records_to_database, iter_snapshot_records_from_database
+from app.services.routes import reconcile_database_routes_to_system, remove_routes_from_system
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency, installed with the "msgpack" extra
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "msgpack": "application/x-msgpack",
+}
+
+# Encoded records are grouped in chunks of roughly this size before being written
+_CHUNK_SIZE = 64 * 1024
+
+
+def check_snapshot_format(fmt: str) -> None:
+    """
+    Validates a snapshot format name.
+
+    Raises:
+        ValueError: If the format is unknown or its optional dependency is not installed.
+    """
+    if fmt not in SNAPSHOT_MEDIA_TYPES:
+        raise ValueError(f"Unknown snapshot format '{fmt}'. Valid formats are: {list(SNAPSHOT_MEDIA_TYPES)}")
+    if fmt == "msgpack" and msgpack is None:
+        raise ValueError("The msgpack snapshot format requires the 'msgpack' package")
+
+
+def encode_snapshot_records(records: Iterable[dict], fmt: str) -> Iterator[bytes]:
+    """
+    Serializes records as NDJSON lines or concatenated msgpack maps.
+
+    Yields:
+        bytes: Chunks of about 64 KiB.
+    """
+    check_snapshot_format(fmt)
+    if fmt == "msgpack":
+        encode = msgpack.Packer().pack
+    else:
+        def encode(record: dict) -> bytes:
+            return json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+    buffer = bytearray()
+    for record in records:
+        buffer += encode(record)
+        if len(buffer) >= _CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def decode_snapshot_records(chunks: Iterable[bytes], fmt: str) -> Iterator[dict]:
+    """
+    Parses NDJSON or msgpack records from a stream of byte chunks, one record at a time.
+
+    Raises:
+        ValueError: If the stream contains invalid data.
+    """
+    check_snapshot_format(fmt)
+    if fmt == "msgpack":
+        unpacker = msgpack.Unpacker(raw=False)
+        for chunk in chunks:
+            unpacker.feed(chunk)
+            for record in unpacker:
+                yield record
+        return
+
+    pending = b""
+    for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+def export_snapshot(fmt: str, include_deleted: bool = False) -> Iterator[bytes]:
+    """
+    Streams the route tables as a snapshot in the given format.
+    """
+    logger.info(f"Exporting {fmt} snapshot (include_deleted={include_deleted})")
+    return encode_snapshot_records(iter_snapshot_records_from_database(include_deleted), fmt)
+
+
+def import_snapshot(chunks: Iterable[bytes], fmt: str, replace: bool = False, apply: bool = True) -> dict:
+    """
+    Restores a snapshot: bulk inserts its records and then applies all active routes
+    to the system in a single kernel pass. When stored routes are replaced, routes that
+    were active before the import and are no longer active are removed from the system.
+
+    Args:
+        chunks (Iterable[bytes]): The snapshot content.
+        fmt (str): Snapshot format ("ndjson" or "msgpack").
+        replace (bool): Overwrite stored routes with the same destination.
+        apply (bool): Reconcile active routes into the system after the import.
+
+    Returns:
+        dict: Imported record counts and the routes that could not be applied to (or removed from) the system.
+    """
+    active_before = {route["to"] for route in get_active_routes_from_database()} if replace and apply else set()
+    counts = import_snapshot_records_to_database(decode_snapshot_records(chunks, fmt), replace=replace)
+
+    failures = {}
+    if apply:
+        if active_before:
+            deactivated = sorted(active_before - {route["to"] for route in get_active_routes_from_database()})
+            failures.update(remove_routes_from_system(deactivated))
+        failures.update(reconcile_database_routes_to_system())
+    return {
+        "imported_routes": counts["routes"],
+        "imported_deleted_routes": counts["deleted_routes"],
+        "system_errors": failures,
+    }
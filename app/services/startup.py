@@ -0,0 +1,106 @@
+# app/services/startup.py
+import logging
+import threading
+import time
+from typing import Optional
+from fastapi import HTTPException
+from app.db.database import create_db_and_tables
+from app.db.routes import load_routes_into_memory
+from app.services.routes import load_database_routes_to_system
+
+logger = logging.getLogger(__name__)
+
+
+class StartupState:
+    """
+    Tracks the progress of the startup phase (database initialization and
+    reconciliation of stored routes into the system).
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.phase: str = "starting"
+        self.processed: int = 0
+        self.total: int = 0
+        self.error: Optional[str] = None
+        self.started_at: float = time.monotonic()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.phase == "ready"
+
+    def set_phase(self, phase: str) -> None:
+        with self._lock:
+            self.phase = phase
+        logger.info(f"Startup phase: {phase}")
+
+    def set_progress(self, processed: int, total: int) -> None:
+        with self._lock:
+            self.processed, self.total = processed, total
+
+    def finish(self, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.phase = "failed" if error else "ready"
+            self.error = error
+            self.finished_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        """
+        Returns the current startup state as a JSON-serializable dictionary.
+        """
+        with self._lock:
+            end = self.finished_at if self.finished_at is not None else time.monotonic()
+            return {
+                "phase": self.phase,
+                "ready": self.phase == "ready",
+                "routes_processed": self.processed,
+                "routes_total": self.total,
+                "elapsed_seconds": round(end - self.started_at, 3),
+                "error": self.error,
+            }
+
+
+startup_state = StartupState()
+
+
+def run_startup() -> bool:
+    """
+    Initializes the database, builds the in-memory indexes and loads active routes
+    into the system, reporting progress in `startup_state`.
+
+    Returns:
+        bool: True if the service is ready, False if startup failed.
+    """
+    try:
+        startup_state.set_phase("initializing_database")
+        create_db_and_tables()
+
+        startup_state.set_phase("building_indexes")
+        database_routes = load_routes_into_memory()
+
+        startup_state.set_phase("reconciling")
+        startup_state.set_progress(0, len(database_routes))
+        load_database_routes_to_system(database_routes, progress=startup_state.set_progress)
+    except Exception as e:
+        logger.error(f"Startup failed: {e}")
+        startup_state.finish(error=str(e))
+        return False
+
+    startup_state.finish()
+    logger.info(f"Startup completed in {startup_state.snapshot()['elapsed_seconds']} seconds")
+    return True
+
+
+def require_ready() -> None:
+    """
+    Dependency that rejects requests until startup has completed.
+
+    Raises:
+        HTTPException: 503 while the service is still starting (or if startup failed).
+    """
+    if not startup_state.ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service not ready (startup phase: {startup_state.phase})",
+            headers={"Retry-After": "1"}
+        )
@@ -1,9 +1,39 @@
 # app/services/utils.py
 import logging
 import subprocess
+from typing import Callable, Optional
+from app.core.config import settings
+from app.core.logging import truncate
+from app.core.tracing import span
 
 logger = logging.getLogger(__name__)
 
+CommandRunner = Callable[..., subprocess.CompletedProcess]
+_command_runner: Optional[CommandRunner] = None
+
+
+def command_runner() -> CommandRunner:
+    """
+    Returns the function used to execute system commands: `subprocess.run`, or the
+    in-memory fake kernel when KERNEL_BACKEND is "fake".
+    """
+    global _command_runner
+    if _command_runner is None:
+        if settings.KERNEL_BACKEND == "fake":
+            from app.services.fake_kernel import fake_kernel
+            _command_runner = fake_kernel
+        else:
+            _command_runner = subprocess.run
+    return _command_runner
+
+
+def set_command_runner(runner: Optional[CommandRunner]) -> None:
+    """
+    Replaces the function used to execute system commands (None restores the configured backend).
+    """
+    global _command_runner
+    _command_runner = runner
+
 
 def run_command(command: list[str]) -> str:
     """
@@ -19,15 +49,61 @@ def run_command(command: list[str]) -> str:
         HTTPException: If the command execution fails.
     """
     logger.info(f"Executing command: {command}")
-    try:
-        result = subprocess.run(
+    with span("run_command", **{"process.command_line": " ".join(command)}):
+        try:
+            result = command_runner()(
+                command,
+                check=True,  # Raises an error if the command fails
+                capture_output=True,  # Captures stdout and stderr
+                text=True  # Decodes stdout and stderr as text
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Command stdout:\n{truncate(result.stdout)}")
+            return result.stdout.strip()
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Command failed. Error:\n{truncate(e.stderr.strip())}")
+            raise e
+
+
+def run_batch_command(command: list[str], lines: list[str]) -> dict[int, str]:
+    """
+    Executes an `ip -force -batch -` style command, feeding it one subcommand per line
+    through stdin. All lines are processed even if some of them fail.
+
+    Args:
+        command (list[str]): The batch command to execute (e.g. ["ip", "-force", "-batch", "-"]).
+        lines (list[str]): The subcommands, one per line (e.g. "route replace to 10.0.0.0/24 dev eth0").
+
+    Returns:
+        dict[int, str]: Error message of each failed line, keyed by line number (starting at 1).
+
+    Raises:
+        subprocess.CalledProcessError: If the command fails without reporting which lines failed.
+    """
+    logger.info(f"Executing batch command: {command} with {len(lines)} lines")
+    with span("run_batch_command", **{"process.command_line": " ".join(command), "batch.lines": len(lines)}):
+        result = command_runner()(
             command,
-            check=True,  # Raises an error if the command fails
-            capture_output=True,  # Captures stdout and stderr
-            text=True  # Decodes stdout and stderr as text
+            input="\n".join(lines) + "\n",
+            capture_output=True,
+            text=True
         )
-        logger.info(f"Command stdout:\n{result.stdout}")
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Command failed. Error:\n{e.stderr.strip()}")
-        raise e
+
+        # Errors are reported as "<message>\nCommand failed -:<line>"
+        failures: dict[int, str] = {}
+        messages: list[str] = []
+        for error_line in result.stderr.splitlines():
+            if error_line.startswith("Command failed"):
+                line_number = error_line.rsplit(":", 1)[-1]
+                if line_number.isdigit():
+                    failures[int(line_number)] = " ".join(messages).strip()
+                messages = []
+            else:
+                messages.append(error_line.strip())
+
+        if result.returncode != 0 and not failures:
+            logger.error(f"Batch command failed. Error:\n{truncate(result.stderr.strip())}")
+            raise subprocess.CalledProcessError(result.returncode, command, result.stdout, result.stderr)
+        if failures:
+            logger.warning(f"Batch command: {len(failures)} of {len(lines)} lines failed")
+        return failures
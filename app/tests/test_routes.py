@@ -1 +1,417 @@
-### TODO: Add Tests for the routes
\ No newline at end of file
+# app/tests/test_routes.py
+import hashlib
+import json
+import os
+import random
+import subprocess
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+# Settings are read when the app is imported: use a temporary database and the in-memory fake kernel
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/test_routes.db",
+    "KERNEL_BACKEND": "fake",
+    "DEFERRED_STARTUP": "false",
+})
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from app.core.clock import VirtualClock, set_clock
+from app.core.config import settings
+from app.db.database import create_db_and_tables
+from app.db.registry import RouteRegistry, route_key, route_to
+from app.db import routes as route_database
+from app.db.routes import (add_route_to_database, get_pending_routes_due_from_database, get_route_from_database, iter_snapshot_records_from_database,
+                           load_routes_into_memory, set_routes_state_in_database)
+from app.db.schedule import RouteScheduleIndex
+from app.main import app
+from app.routers import routes as route_router
+from app.schemas.routes import Route, RouteUpdate
+from app.services import routes as route_service
+from app.services import groups as group_service
+from app.services import idempotency
+from app.services.fake_kernel import FakeKernel
+from app.services.routes import add_route_to_system, update_route
+from app.services.startup import run_startup
+from app.services.utils import run_batch_command, set_command_runner
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def at(seconds: Optional[float]) -> Optional[datetime]:
+    return START + timedelta(seconds=seconds) if seconds is not None else None
+
+
+def random_interval(rng: random.Random) -> tuple[Optional[float], Optional[float]]:
+    """
+    Returns a random lifetime (seconds from START), possibly open-ended or empty.
+    """
+    start = rng.choice([None, rng.uniform(0, 1000)])
+    end = rng.choice([None, (start or 0) + rng.uniform(-20, 300)])
+    return start, end
+
+
+def brute_force_active_at(intervals: dict[str, tuple[Optional[float], Optional[float]]], t: float) -> list[str]:
+    return sorted(to for to, (start, end) in intervals.items() if (start is None or start <= t) and (end is None or t < end))
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_active_at_matches_brute_force(seed):
+    rng = random.Random(seed)
+    intervals = {f"10.0.{i // 256}.{i % 256}/32": random_interval(rng) for i in range(1500)}
+    index = RouteScheduleIndex()
+    index.load({"to": to, "create_at": at(start), "delete_at": at(end)} for to, (start, end) in intervals.items())
+
+    # Enough mutations to go through several overlays and tree rebuilds
+    for step in range(3000):
+        to = f"10.0.{rng.randrange(8)}.{rng.randrange(256)}/32"
+        if rng.random() < 0.3:
+            index.remove(to)
+            intervals.pop(to, None)
+        else:
+            intervals[to] = random_interval(rng)
+            index.upsert(to, at(intervals[to][0]), at(intervals[to][1]))
+
+        if step % 100 == 0:
+            for t in (rng.uniform(-10, 1400), *rng.sample([s for s, _ in intervals.values() if s is not None], 3)):
+                assert sorted(route["to"] for route in index.active_at(at(t))) == brute_force_active_at(intervals, t)
+
+
+def test_active_at_boundaries():
+    index = RouteScheduleIndex()
+    index.upsert("10.0.0.0/24", at(100), at(200))
+    index.upsert("10.0.1.0/24", None, at(100))
+    index.upsert("10.0.2.0/24", at(200), None)
+
+    assert [route["to"] for route in index.active_at(at(99))] == ["10.0.1.0/24"]
+    assert [route["to"] for route in index.active_at(at(100))] == ["10.0.0.0/24"]  # [create_at, delete_at)
+    assert sorted(route["to"] for route in index.active_at(at(200))) == ["10.0.2.0/24"]
+    assert index.active_at(at(150)) == [{"to": "10.0.0.0/24", "create_at": at(100).isoformat(), "delete_at": at(200).isoformat()}]
+
+
+@pytest.mark.parametrize("to", [
+    "0.0.0.0/0", "10.0.0.0/8", "192.168.1.0/24", "192.168.1.24/32", "255.255.255.255/32",
+    "::/0", "2001:db8::/32", "2001:db8::1/128", "fe80::/64", "ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff/128",
+])
+def test_route_key_round_trip(to):
+    assert route_to(route_key(to)) == to
+
+
+def test_route_key_distinguishes_families_and_prefixes():
+    keys = {route_key(to) for to in ["10.0.0.0/8", "10.0.0.0/16", "::a00:0/8", "::a00:0/104", "0.0.0.0/0", "::/0"]}
+    assert len(keys) == 6
+    assert route_to(route_key("192.168.1.24")) == "192.168.1.24/32"
+    assert route_to(route_key("2001:db8::1")) == "2001:db8::1/128"
+    with pytest.raises(ValueError):
+        route_key("not-an-ip/24")
+
+
+def test_registry_pending_due():
+    registry = RouteRegistry()
+    registry.load([
+        {"to": "10.0.0.1/32", "via": None, "dev": "lo", "create_at": at(300), "delete_at": None, "active": False, "status": "pending"},
+        {"to": "10.0.0.2/32", "via": None, "dev": "lo", "create_at": at(100), "delete_at": None, "active": False, "status": "pending"},
+        {"to": "10.0.0.3/32", "via": None, "dev": "lo", "create_at": at(0), "delete_at": None, "active": True, "status": "active"},
+    ])
+    registry.upsert("10.0.0.4/32", None, "lo", at(200), None, False, "pending")
+
+    assert [route["to"] for route in registry.pending_due(at(250))] == ["10.0.0.2/32", "10.0.0.4/32"]
+    registry.update("10.0.0.2/32", active=True, status="active")
+    registry.update("10.0.0.4/32", status="paused")
+    assert [route["to"] for route in registry.pending_due(at(1000))] == ["10.0.0.1/32"]
+    registry.remove("10.0.0.1/32")
+    assert registry.pending_due(at(1000)) == []
+
+
+@pytest.fixture
+def kernel():
+    """
+    A fresh fake kernel used for every system command of the test.
+    """
+    fake = FakeKernel()
+    set_command_runner(fake)
+    yield fake
+    set_command_runner(None)
+
+
+@pytest.fixture
+def clock():
+    virtual = VirtualClock(START)
+    previous = set_clock(virtual)
+    yield virtual
+    set_clock(previous)
+
+
+@pytest.fixture(scope="module")
+def database():
+    create_db_and_tables()
+    load_routes_into_memory()
+
+
+def test_run_batch_command_reports_failed_lines(kernel):
+    kernel(["ip", "route", "add", "10.0.3.0/24", "dev", "lo"])
+    failures = run_batch_command(["ip", "-force", "-batch", "-"], [
+        "route add to 10.0.1.0/24 dev lo",
+        "route add to not-a-prefix dev lo",
+        "route del to 10.0.2.0/24",
+        "route add to 10.0.3.0/24 dev lo",
+        "route replace to 10.0.4.0/24 dev lo",
+    ])
+
+    assert failures == {
+        2: 'Error: any valid prefix is expected rather than "not-a-prefix".',
+        3: "RTNETLINK answers: No such process",
+        4: "RTNETLINK answers: File exists",
+    }
+    assert set(kernel.routes) == {"10.0.1.0/24", "10.0.3.0/24", "10.0.4.0/24"}
+
+
+def test_run_batch_command_parses_multiline_errors():
+    stderr = "Error: Nexthop has invalid gateway.\nCommand failed -:1\nError: inet prefix is expected\nrather than \"x\".\nCommand failed -:3\n"
+    set_command_runner(lambda command, **kwargs: subprocess.CompletedProcess(command, 1, "", stderr))
+    try:
+        failures = run_batch_command(["ip", "-force", "-batch", "-"], ["a", "b", "c"])
+    finally:
+        set_command_runner(None)
+
+    assert failures == {1: "Error: Nexthop has invalid gateway.", 3: 'Error: inet prefix is expected rather than "x".'}
+
+
+def test_run_batch_command_raises_without_line_numbers():
+    set_command_runner(lambda command, **kwargs: subprocess.CompletedProcess(command, 1, "", "Object \"x\" is unknown\n"))
+    try:
+        with pytest.raises(subprocess.CalledProcessError):
+            run_batch_command(["ip", "-force", "-batch", "-"], ["x"])
+    finally:
+        set_command_runner(None)
+
+
+def installed_route(to: str) -> dict:
+    """
+    Stores an active route on `lo` (created at START) and installs it in the kernel.
+    """
+    route = Route(to=to, dev="lo", create_at=START)
+    add_route_to_database(route, active=True, status="active")
+    add_route_to_system(route)
+    return get_route_from_database(to)
+
+
+def test_update_route_noop(database, kernel, clock):
+    route = installed_route("10.1.0.1/32")
+    calls = kernel.calls
+
+    assert update_route(route, RouteUpdate(to=route["to"], dev="lo", create_at=START)) is None
+    assert kernel.calls == calls
+    assert get_route_from_database(route["to"]) == route
+
+
+def test_update_route_schedule_only(database, kernel, clock):
+    route = installed_route("10.1.0.2/32")
+    calls = kernel.calls
+
+    assert update_route(route, RouteUpdate(to=route["to"], delete_at=at(3600))) == "active"
+    assert kernel.calls == calls
+    assert kernel.routes["10.1.0.2"]["dev"] == "lo"
+    stored = get_route_from_database(route["to"])
+    assert (stored["active"], stored["delete_at"]) == (True, at(3600).isoformat())
+
+
+def test_update_route_replaces_next_hop(database, kernel, clock):
+    route = installed_route("10.1.0.3/32")
+    calls = kernel.calls
+
+    assert update_route(route, RouteUpdate(to=route["to"], via="192.0.2.1")) == "active"
+    # A single `ip route replace`: the route never leaves the kernel
+    assert kernel.calls == calls + 1
+    assert kernel.routes["10.1.0.3"] == {"via": "192.0.2.1", "dev": None, "proto": "201"}
+    stored = get_route_from_database(route["to"])
+    assert (stored["via"], stored["dev"], stored["active"]) == ("192.0.2.1", None, True)
+
+
+def test_update_route_moved_to_the_future(database, kernel, clock):
+    route = installed_route("10.1.0.4/32")
+
+    assert update_route(route, RouteUpdate(to=route["to"], create_at=at(600))) == "pending"
+    assert "10.1.0.4" not in kernel.routes
+    stored = get_route_from_database(route["to"])
+    assert (stored["status"], stored["active"]) == ("pending", False)
+    assert route["to"] not in [due["to"] for due in get_pending_routes_due_from_database(at(599))]
+    assert route["to"] in [due["to"] for due in get_pending_routes_due_from_database(at(600))]
+
+
+def test_update_route_restores_system_on_database_error(database, kernel, clock, monkeypatch):
+    route = installed_route("10.1.0.5/32")
+
+    def failing_update(*args, **kwargs):
+        raise RuntimeError("database is locked")
+    monkeypatch.setattr(route_service, "update_route_in_database", failing_update)
+
+    with pytest.raises(RuntimeError):
+        update_route(route, RouteUpdate(to=route["to"], via="192.0.2.1"))
+    assert kernel.routes["10.1.0.5"]["dev"] == "lo"
+    with pytest.raises(RuntimeError):
+        update_route(route, RouteUpdate(to=route["to"], create_at=at(600)))
+    assert kernel.routes["10.1.0.5"]["dev"] == "lo"
+    assert get_route_from_database(route["to"]) == route
+
+
+def test_update_route_decides_on_the_stored_state(database, kernel, clock):
+    route = installed_route("10.1.0.7/32")
+    # Paused (by a group operation) after the caller read the route
+    route_service.delete_route_from_system(route["to"])
+    set_routes_state_in_database([route["to"]], active=False, status="paused")
+
+    assert update_route(route, RouteUpdate(to=route["to"], via="192.0.2.1")) == "paused"
+    assert "10.1.0.7" not in kernel.routes
+    stored = get_route_from_database(route["to"])
+    assert (stored["via"], stored["status"], stored["active"]) == ("192.0.2.1", "paused", False)
+
+
+def test_route_times_are_stored_in_utc(database, kernel, clock):
+    offset = timezone(timedelta(hours=5))
+    route = Route(to="10.1.0.6/32", dev="lo", create_at=at(600).astimezone(offset), delete_at=at(3600).astimezone(offset))
+    add_route_to_database(route, active=False, status="pending")
+    cached = get_route_from_database("10.1.0.6/32")
+
+    # The write-through and the table agree once reloaded
+    load_routes_into_memory()
+    assert get_route_from_database("10.1.0.6/32") == cached
+    assert (cached["create_at"], cached["delete_at"]) == (at(600).isoformat(), at(3600).isoformat())
+    assert "10.1.0.6/32" in [due["to"] for due in get_pending_routes_due_from_database(at(600))]
+
+
+@pytest.fixture
+def client(database, kernel, clock, monkeypatch):
+    """
+    An authenticated client of the started service, with an empty idempotency cache.
+    """
+    monkeypatch.setattr(idempotency, "idempotency_cache", idempotency.IdempotencyCache(100, 3600, persist=False))
+    assert run_startup()
+    return TestClient(app, headers={"Authorization": f"Bearer {settings.APITOKEN}"}, raise_server_exceptions=False)
+
+
+def test_idempotency_replays_response(client, kernel):
+    first = client.put("/routes/", json={"to": "10.2.0.1/32", "dev": "lo"}, headers={"Idempotency-Key": "put-1"})
+    calls = kernel.calls
+    replayed = client.put("/routes/", json={"to": "10.2.0.1/32", "dev": "lo"}, headers={"Idempotency-Key": "put-1"})
+
+    assert first.status_code == replayed.status_code == 201
+    assert replayed.json() == first.json()
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert kernel.calls == calls
+
+
+def test_idempotency_rejects_reused_key(client):
+    assert client.put("/routes/", json={"to": "10.2.0.2/32", "dev": "lo"}, headers={"Idempotency-Key": "put-2"}).status_code == 201
+    response = client.put("/routes/", json={"to": "10.2.0.3/32", "dev": "lo"}, headers={"Idempotency-Key": "put-2"})
+
+    assert response.status_code == 422
+    assert get_route_from_database("10.2.0.3/32") is None
+
+
+def test_idempotency_rejects_duplicate_in_progress(client):
+    scoped_key = hashlib.sha256(f"Bearer {settings.APITOKEN}\0put-3".encode()).hexdigest()
+    assert idempotency.idempotency_cache.begin(scoped_key)
+    response = client.put("/routes/", json={"to": "10.2.0.4/32", "dev": "lo"}, headers={"Idempotency-Key": "put-3"})
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert get_route_from_database("10.2.0.4/32") is None
+
+
+def test_idempotency_rejects_unfingerprintable_body(client):
+    body = b'{"to": "10.2.0.5/32", "dev": "lo"}'
+    streamed = client.put("/routes/", content=iter([body]), headers={"Idempotency-Key": "put-4", "Content-Type": "application/json"})
+    too_large = client.post("/routes/import", content=b" " * (idempotency.FINGERPRINT_BODY_LIMIT + 1), headers={"Idempotency-Key": "import-1"})
+
+    assert (streamed.status_code, too_large.status_code) == (400, 400)
+    assert get_route_from_database("10.2.0.5/32") is None
+
+
+def test_idempotency_does_not_store_errors(client, monkeypatch):
+    def failing_add(route):
+        raise subprocess.CalledProcessError(2, ["ip", "route", "add"], stderr="RTNETLINK answers: Network is unreachable")
+    monkeypatch.setattr(route_router, "add_route_to_system", failing_add)
+    assert client.put("/routes/", json={"to": "10.2.0.6/32", "dev": "lo"}, headers={"Idempotency-Key": "put-5"}).status_code == 500
+    monkeypatch.setattr(route_router, "add_route_to_system", add_route_to_system)
+
+    unauthorized = client.put("/routes/", json={"to": "10.2.0.6/32", "dev": "lo"},
+                              headers={"Idempotency-Key": "put-5", "Authorization": "Bearer wrong"})
+    assert unauthorized.status_code == 401
+    assert len(idempotency.idempotency_cache) == 0
+
+    retried = client.put("/routes/", json={"to": "10.2.0.6/32", "dev": "lo"}, headers={"Idempotency-Key": "put-5"})
+    assert retried.status_code == 201
+    assert "Idempotent-Replayed" not in retried.headers
+
+
+def failing_database_write(*args, **kwargs):
+    raise OperationalError("UPDATE routes", {}, Exception("database is locked"))
+
+
+def test_group_pause_restores_system_on_database_error(client, kernel, monkeypatch):
+    for to in ("10.3.0.1/32", "10.3.0.2/32"):
+        assert client.put("/routes/", json={"to": to, "dev": "lo", "group": "rollback-pause"}).status_code == 201
+    monkeypatch.setattr(group_service, "set_routes_state_in_database", failing_database_write)
+
+    assert client.patch("/routes/groups/rollback-pause/pause").status_code == 500
+    assert {"10.3.0.1", "10.3.0.2"} <= set(kernel.routes)
+    assert [get_route_from_database(to)["status"] for to in ("10.3.0.1/32", "10.3.0.2/32")] == ["active", "active"]
+
+
+def test_group_activate_restores_system_on_database_error(client, kernel, monkeypatch):
+    for to in ("10.3.0.3/32", "10.3.0.4/32"):
+        assert client.put("/routes/", json={"to": to, "dev": "lo", "group": "rollback-activate"}).status_code == 201
+    assert client.patch("/routes/groups/rollback-activate/pause").status_code == 200
+    monkeypatch.setattr(group_service, "set_routes_state_in_database", failing_database_write)
+
+    assert client.patch("/routes/groups/rollback-activate/activate").status_code == 500
+    assert not {"10.3.0.3", "10.3.0.4"} & set(kernel.routes)
+    assert [get_route_from_database(to)["status"] for to in ("10.3.0.3/32", "10.3.0.4/32")] == ["paused", "paused"]
+
+
+def ndjson(*records: dict) -> bytes:
+    return "".join(json.dumps(record) + "\n" for record in records).encode()
+
+
+@pytest.mark.parametrize("invalid", [
+    {"to": "not-an-ip", "dev": "lo", "active": False, "status": "pending", "create_at": "2030-01-01T00:00:00"},
+    {"to": "10.4.0.9/32", "dev": "lo", "active": "false", "status": "pending", "create_at": "2030-01-01T00:00:00"},
+    {"to": "10.4.0.9/32", "dev": "no-such-dev0", "active": False, "status": "pending", "create_at": "2030-01-01T00:00:00"},
+    {"to": "10.4.0.9/32", "active": False, "status": "pending", "create_at": "2030-01-01T00:00:00"},
+    {"to": "10.4.0.9/32", "dev": "lo", "status": "pending"},
+    {"table": "other", "to": "10.4.0.9/32"},
+])
+def test_import_rejects_invalid_records(client, invalid):
+    valid = {"to": "10.4.0.1/32", "dev": "lo", "active": False, "status": "pending", "create_at": "2030-01-01T00:00:00"}
+    response = client.post("/routes/import", content=ndjson(valid, invalid))
+
+    assert response.status_code == 422
+    assert get_route_from_database("10.4.0.1/32") is None
+
+
+def test_import_replace_removes_deactivated_routes(client, kernel):
+    assert client.put("/routes/", json={"to": "10.4.0.2/32", "dev": "lo"}).status_code == 201
+    snapshot = ndjson(
+        {"to": "10.4.0.2/32", "dev": "lo", "active": False, "status": "paused", "create_at": START.isoformat()},
+        {"to": "10.4.0.3/32", "dev": "lo", "active": True, "status": "active", "create_at": START.isoformat()},
+    )
+    response = client.post("/routes/import", params={"on_conflict": "replace"}, content=snapshot)
+
+    assert response.status_code == 200
+    assert response.json() == {"imported_routes": 2, "imported_deleted_routes": 0, "system_errors": {}}
+    assert "10.4.0.2" not in kernel.routes and "10.4.0.3" in kernel.routes
+    assert get_route_from_database("10.4.0.2/32")["status"] == "paused"
+
+
+def test_export_pages_through_tables(database, clock, monkeypatch):
+    for i in range(7):
+        add_route_to_database(Route(to=f"10.4.1.{i}/32", dev="lo", create_at=at(600)), active=False, status="pending")
+    monkeypatch.setattr(route_database, "SNAPSHOT_BATCH_SIZE", 3)
+    records = list(iter_snapshot_records_from_database(include_deleted=True))
+    routes = [record["to"] for record in records if record["table"] == "routes"]
+
+    assert len(routes) == len(set(routes)) == len(load_routes_into_memory())
+    assert routes == sorted(routes)
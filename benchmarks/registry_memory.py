@@ -0,0 +1,74 @@
+# benchmarks/registry_memory.py
+"""
+Memory-use benchmark of the in-memory route registry.
+
+Loads N synthetic routes into a `RouteRegistry` and reports the memory it holds
+(measured with tracemalloc), compared with the list of dictionaries returned by a
+database read of the same table. Also times O(1) lookups and O(k) status reads.
+
+Usage:
+    uv run python -m benchmarks.registry_memory [--routes 1000000]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from app.db.registry import RouteRegistry
+
+
+def synthetic_routes(count: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "to": f"{10 + i // 16777216}.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}/32",
+            "via": f"192.168.{i // 256 % 256}.{i % 254 + 1}" if i % 2 else None,
+            "dev": None if i % 2 else f"eth{i % 4}",
+            "create_at": (now - timedelta(seconds=i)).isoformat(),
+            "delete_at": (now + timedelta(days=1, seconds=i)).isoformat() if i % 3 else None,
+            "active": bool(i % 5),
+            "status": "active" if i % 5 else "pending",
+        }
+        for i in range(count)
+    ]
+
+
+def measure(build) -> tuple[object, int]:
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return result, used
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    dicts, dicts_bytes = measure(lambda: synthetic_routes(args.routes))
+    print(f"list[dict] ({args.routes} routes): {dicts_bytes / 2**20:8.1f} MiB, {dicts_bytes / args.routes:6.1f} B/route")
+
+    registry = RouteRegistry()
+    start = time.perf_counter()
+    _, registry_bytes = measure(lambda: registry.load(dicts))
+    load_seconds = time.perf_counter() - start
+    print(f"RouteRegistry ({len(registry)} routes): {registry_bytes / 2**20:8.1f} MiB, {registry_bytes / args.routes:6.1f} B/route (load {load_seconds:.1f} s)")
+
+    probes = [route["to"] for route in dicts[::max(1, args.routes // 10_000)]]
+    del dicts
+    start = time.perf_counter()
+    for to in probes:
+        registry.get(to)
+    print(f"get(): {(time.perf_counter() - start) / len(probes) * 1e6:.1f} us/lookup")
+
+    start = time.perf_counter()
+    pending = registry.by_status("pending")
+    print(f"by_status('pending'): {len(pending)} routes in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# benchmarks/simulation.py
+"""
+Virtual-clock soak test of the route lifecycle.
+
+Replays a workload of PUT/PATCH/pause/activate/DELETE requests with scheduled windows
+against the API, at accelerated time: a `VirtualClock` replaces the wall clock and the
+lifecycle tick (`run_lifecycle_tick`) runs every `--interval` virtual seconds.
+Routes are installed in the in-memory fake kernel and stored in a temporary database,
+so the host routing table is never touched.
+
+Reports:
+- lateness of scheduled activations/expirations (tick time - scheduled time),
+- throughput (requests and ticks per wall-clock second, virtual time speed-up),
+- memory growth over the simulated period (tracemalloc),
+- consistency between the fake kernel and the installed routes of the registry.
+
+The workload is generated (seeded) or replayed from a JSON lines file previously written
+with --record. Each line is {"at": <seconds>, "method": ..., "path": ..., "body": {...}};
+"at", "create_at" and "delete_at" are offsets in seconds from the start of the simulation.
+
+Usage:
+    uv run python -m benchmarks.simulation [--routes 2000] [--days 7] [--seed 1]
+    uv run python -m benchmarks.simulation --record workload.jsonl
+    uv run python -m benchmarks.simulation --workload workload.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+DAY = 86400.0
+
+
+def generate_workload(routes: int, duration: float, interval: float, seed: int) -> list[dict]:
+    """
+    Generates a workload: every route is added once (80% scheduled in the future), then
+    10% are rescheduled, 5% paused and resumed and 5% deleted before they expire.
+    """
+    rng = random.Random(seed)
+    operations: list[dict] = []
+
+    def operation(at: float, method: str, path: str, body: dict) -> None:
+        operations.append({"at": round(at, 3), "method": method, "path": path, "body": body})
+
+    for i in range(routes):
+        to = f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}/32"
+        put_at = rng.uniform(0, duration * 0.5)
+        create_at = put_at + (rng.expovariate(1 / 3600) if rng.random() < 0.8 else 0.0)
+        delete_at = create_at + rng.uniform(600, duration * 0.5)
+        operation(put_at, "PUT", "/routes/", {"to": to, "dev": "lo", "create_at": create_at, "delete_at": delete_at})
+
+        action = rng.random()
+        if action < 0.10:
+            at = rng.uniform(put_at, delete_at)
+            operation(at, "PATCH", "/routes/", {"to": to, "delete_at": delete_at + rng.uniform(60, 3600)})
+        elif action < 0.15 and delete_at - create_at > 4 * interval:
+            paused_at = rng.uniform(create_at + 2 * interval, delete_at - interval)
+            operation(paused_at, "PATCH", "/routes/pause", {"to": to})
+            operation(rng.uniform(paused_at, delete_at), "PATCH", "/routes/activate", {"to": to})
+        elif action < 0.20:
+            operation(rng.uniform(put_at, delete_at), "DELETE", "/routes/", {"to": to})
+
+    operations.sort(key=lambda op: op["at"])
+    return operations
+
+
+def percentiles(values: list[float]) -> str:
+    if not values:
+        return "n/a"
+    if len(values) == 1:
+        return f"p50 {values[0]:.1f}"
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return f"p50 {cuts[49]:.2f}  p90 {cuts[89]:.2f}  p99 {cuts[98]:.2f}  max {max(values):.2f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=2_000, help="Routes in the generated workload")
+    parser.add_argument("--days", type=float, default=7.0, help="Simulated period")
+    parser.add_argument("--interval", type=float, default=10.0, help="Lifecycle tick interval (virtual seconds)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workload", help="Replay a recorded workload (JSON lines) instead of generating one")
+    parser.add_argument("--record", help="Write the generated workload to this file and exit")
+    args = parser.parse_args()
+
+    duration = args.days * DAY
+    if args.workload:
+        operations = [json.loads(line) for line in Path(args.workload).read_text().splitlines() if line.strip()]
+        duration = max(duration, max((op["at"] for op in operations), default=0.0))
+    else:
+        operations = generate_workload(args.routes, duration, args.interval, args.seed)
+    if args.record:
+        Path(args.record).write_text("".join(json.dumps(op) + "\n" for op in operations))
+        print(f"{len(operations)} operations written to {args.record}")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read when the app is imported: configure it first
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{tmp}/simulation.db",
+            "KERNEL_BACKEND": "fake",
+            "DEFERRED_STARTUP": "false",
+            "LOG_LEVEL": os.environ.get("LOG_LEVEL", "ERROR"),
+        })
+        from fastapi.testclient import TestClient
+        from app.core.clock import VirtualClock, set_clock
+        from app.core.config import settings
+        from app.db.registry import route_registry
+        from app.main import app
+        from app.services.fake_kernel import FakeKernel, fake_kernel
+        from app.services.lifecycle import run_lifecycle_tick
+        from app.services.startup import run_startup
+
+        start = datetime.now(timezone.utc).replace(microsecond=0)
+        clock = VirtualClock(start)
+        set_clock(clock)
+
+        tracemalloc.start()
+        assert run_startup()
+        # No `with`: the lifespan (and its own lifecycle loop) is not started, ticks are driven below
+        client = TestClient(app, headers={"Authorization": f"Bearer {settings.APITOKEN}"})
+
+        def timestamp(offset: float) -> str:
+            return (start + timedelta(seconds=offset)).isoformat()
+
+        activation_lateness: list[float] = []
+        expiration_lateness: list[float] = []
+        tick_seconds: list[float] = []
+        responses: Counter = Counter()
+        memory: list[tuple[float, int]] = [(0.0, tracemalloc.get_traced_memory()[0])]
+        memory_step = duration / 10
+        failed_transitions = 0
+
+        wall_start = time.perf_counter()
+        request_seconds = 0.0
+        next_tick = 0.0
+        for op in [*operations, None]:
+            until = op["at"] if op is not None else duration
+            while next_tick <= until:
+                now = clock.advance_to(start + timedelta(seconds=next_tick))
+                tick_start = time.perf_counter()
+                outcome = run_lifecycle_tick(now)
+                tick_seconds.append(time.perf_counter() - tick_start)
+                activation_lateness.extend((now - datetime.fromisoformat(r["create_at"])).total_seconds() for r in outcome["activated"])
+                expiration_lateness.extend((now - datetime.fromisoformat(r["delete_at"])).total_seconds() for r in outcome["expired"])
+                failed_transitions += len(outcome["failed"])
+                if next_tick >= memory[-1][0] + memory_step:
+                    memory.append((next_tick, tracemalloc.get_traced_memory()[0]))
+                next_tick += args.interval
+            if op is None:
+                break
+
+            clock.advance_to(start + timedelta(seconds=op["at"]))
+            body = {key: timestamp(value) if key in ("create_at", "delete_at") else value for key, value in op["body"].items()}
+            request_start = time.perf_counter()
+            response = client.request(op["method"], op["path"], json=body)
+            request_seconds += time.perf_counter() - request_start
+            responses[f"{op['method']} {op['path']} {response.status_code}"] += 1
+
+        wall = time.perf_counter() - wall_start
+        memory.append((duration, tracemalloc.get_traced_memory()[0]))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        installed = {FakeKernel.normalize(route["to"]) for route in route_registry.active()}
+        kernel = set(fake_kernel.routes)
+
+    print(f"simulated {duration / DAY:.2f} days in {wall:.1f} s wall ({duration / wall:,.0f}x real time)")
+    print(f"requests: {len(operations)} in {request_seconds:.1f} s ({len(operations) / request_seconds:,.0f} req/s)")
+    print(f"ticks: {len(tick_seconds)} ({len(tick_seconds) / sum(tick_seconds):,.0f} ticks/s), tick duration ms: "
+          f"{percentiles([s * 1000 for s in tick_seconds])}")
+    print(f"activation lateness s ({len(activation_lateness)}): {percentiles(activation_lateness)}")
+    print(f"expiration lateness s ({len(expiration_lateness)}): {percentiles(expiration_lateness)}")
+    print(f"failed lifecycle transitions: {failed_transitions}")
+    print("responses:")
+    for key, count in sorted(responses.items()):
+        print(f"  {key}: {count}")
+    print("traced memory (MiB) by simulated day: " + ", ".join(f"{at / DAY:.1f}d {used / 2**20:.1f}" for at, used in memory))
+    print(f"memory growth: {(memory[-1][1] - memory[0][1]) / 2**20:+.1f} MiB, peak {peak / 2**20:.1f} MiB")
+    print(f"kernel/registry consistency: {len(kernel)} kernel routes, {len(installed)} installed routes, "
+          f"{len(kernel - installed)} stray, {len(installed - kernel)} missing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/startup.py
+"""
+Startup-time benchmark.
+
+Measures, each in a fresh interpreter:
+- the cold import of `app.main` (time until uvicorn could start accepting connections), and
+- the startup phase (`run_startup`: tables, indexes and reconciliation) for several table sizes.
+
+The `ip` command is replaced by a no-op executable placed first in PATH, so process
+spawning is measured but the host routing table is never touched.
+
+Usage:
+    uv run python -m benchmarks.startup [--sizes 0 1000 10000] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import app.main
+print(time.perf_counter() - start)
+"""
+
+POPULATE_SNIPPET = """
+import sys
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert
+from sqlmodel import Session
+from app.db.database import engine, create_db_and_tables
+from app.db.models.routes import DBRoute
+
+size = int(sys.argv[1])
+now = datetime.now(timezone.utc)
+create_db_and_tables()
+rows = [
+    {
+        "to": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}/32",
+        "dev": "lo",
+        "create_at": now - timedelta(minutes=1) if i % 2 else now + timedelta(days=1),
+        "delete_at": now + timedelta(days=2),
+        "active": bool(i % 2),
+        "status": "active" if i % 2 else "pending",
+    }
+    for i in range(size)
+]
+with Session(engine) as session, session.begin():
+    if rows:
+        session.execute(insert(DBRoute), rows)
+"""
+
+STARTUP_SNIPPET = """
+import time
+from app.services.startup import run_startup
+start = time.perf_counter()
+assert run_startup()
+print(time.perf_counter() - start)
+"""
+
+
+def run_snippet(snippet: str, env: dict, *args: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", snippet, *args],
+        cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    )
+    return float(result.stdout.strip().splitlines()[-1]) if result.stdout.strip() else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fake_ip = Path(tmp) / "ip"
+        fake_ip.write_text("#!/bin/sh\nexit 0\n")
+        fake_ip.chmod(0o755)
+
+        base_env = {
+            **os.environ,
+            "PATH": f"{tmp}{os.pathsep}{os.environ.get('PATH', '')}",
+            "LOG_LEVEL": "WARNING",
+            "PYTHONDONTWRITEBYTECODE": "1",
+        }
+
+        env = {**base_env, "DATABASE_URL": f"sqlite:///{tmp}/import.db"}
+        samples = [run_snippet(IMPORT_SNIPPET, env) for _ in range(args.repeat)]
+        print(f"cold import of app.main: median {statistics.median(samples) * 1000:.1f} ms over {args.repeat} runs")
+
+        for size in args.sizes:
+            db = Path(tmp) / f"routes_{size}.db"
+            env = {**base_env, "DATABASE_URL": f"sqlite:///{db}"}
+            run_snippet(POPULATE_SNIPPET, env, str(size))
+            samples = [run_snippet(STARTUP_SNIPPET, env) for _ in range(args.repeat)]
+            print(f"startup phase with {size:>7} routes: median {statistics.median(samples) * 1000:.1f} ms over {args.repeat} runs")
+
+
+if __name__ == "__main__":
+    main()